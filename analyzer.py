@@ -0,0 +1,310 @@
+# analyzer.py
+import argparse
+import json
+import sys
+from collections import deque
+
+import database
+from rule_base import get_rule_base
+
+
+def _fact_graph(rule_base):
+    """事实依赖图：条件 -> 结论（邻接表，按规则顺序）"""
+    graph = {}
+    for _, cond_list, concl in rule_base.rules:
+        for c in cond_list:
+            graph.setdefault(c, []).append(concl)
+        graph.setdefault(concl, [])
+    return graph
+
+
+def _components(graph):
+    """Tarjan 强连通分量（迭代实现，规则链很深时也不会超出递归深度），返回 事实 -> 分量编号
+
+    分量编号按逆拓扑序给出：被依赖的分量编号更大。
+    """
+    index = {}
+    low = {}
+    comp = {}
+    stack = []
+    on_stack = set()
+    counter = 0
+    n_comp = 0
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, it = work[-1]
+            for succ in it:
+                if succ not in index:
+                    index[succ] = low[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(graph[succ])))
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        comp[member] = n_comp
+                        if member == node:
+                            break
+                    n_comp += 1
+    return comp
+
+
+class Stratification:
+    """按依赖关系分层：每层规则的条件只来自更低的层（或同一个环），按层顺序求值即可
+
+    strata 为 [(规则下标元组, 是否含环)]；不含环的层只需按顺序扫描一遍，
+    含环的层在本层内迭代到不动点。规则库无环时 acyclic 为 True，整个推理只扫描一遍。
+    """
+
+    def __init__(self, rule_base):
+        rules = rule_base.rules
+        comp = _components(_fact_graph(rule_base))
+        # 分量编号为逆拓扑序，从大到小处理即可保证条件所在分量先算好层号
+        level = {}
+        rule_level = [0] * len(rules)
+        recursive_rule = [False] * len(rules)
+        by_comp = {}
+        for idx, (_, _, concl) in enumerate(rules):
+            by_comp.setdefault(comp[concl], []).append(idx)
+        for c in sorted(by_comp, reverse=True):
+            lv = 1
+            for idx in by_comp[c]:
+                for cond in rules[idx][1]:
+                    cc = comp[cond]
+                    if cc == c:
+                        recursive_rule[idx] = True
+                    else:
+                        lv = max(lv, level.get(cc, 0) + 1)
+            level[c] = lv
+            for idx in by_comp[c]:
+                rule_level[idx] = lv
+
+        self.components = comp
+        self.rule_level = rule_level
+        self._recursive_rule = recursive_rule
+        self.recursive = [idx for idx, r in enumerate(recursive_rule) if r]
+        layers = {}
+        for idx, lv in enumerate(rule_level):
+            layers.setdefault(lv, []).append(idx)
+        self.strata = [
+            (tuple(layers[lv]), any(recursive_rule[idx] for idx in layers[lv]))
+            for lv in sorted(layers)
+        ]
+        self.acyclic = not self.recursive
+
+    def evaluation_plan(self, rule_base):
+        """推理用的求值计划 [(规则元组, 是否含环)]
+
+        去掉一定不会触发的规则：结论本身就是条件的规则，以及与更早规则完全相同的规则。
+        这里只做线性时间的检查（推理的第一次调用会用到它）；被包含的冗余规则只在 analyze() 中报告。
+        """
+        rules = rule_base.rules
+        never = {idx for idx in self.recursive if rules[idx][2] in rules[idx][1]}
+        seen = set()
+        for idx, (_, cond_list, concl) in enumerate(rules):
+            key = (concl, frozenset(cond_list))
+            if key in seen:
+                never.add(idx)
+            else:
+                seen.add(key)
+        plan = []
+        for layer, _ in self.strata:
+            kept = [idx for idx in layer if idx not in never]
+            if kept:
+                plan.append((tuple(rules[idx] for idx in kept), any(self._recursive_rule[idx] for idx in kept)))
+        return plan
+
+
+def evaluation_plan(rule_base):
+    """当前规则库快照的分层求值计划（每个快照只计算一次）"""
+    return rule_base.cached("plan", lambda rb: rb.cached("strata", Stratification).evaluation_plan(rb))
+
+
+class Report:
+    """规则库静态检查结果（规则均以数据库中的 rule_id 表示）"""
+
+    def __init__(self):
+        self.duplicates = []   # [(rule_id, 与之相同的更早规则 id)]
+        self.subsumed = []     # [(rule_id, 条件更少、结论相同的规则 id)]
+        self.cycles = []       # [[同一个环上的规则 id, ...]]
+        self.dead = []         # [(rule_id, 原因)]
+        self.unreachable = []  # 任何输入特征都推不出的结论
+        self.strata = 0
+        self.acyclic = True
+        self._dead_self = set()
+        self._duplicate_idx = []
+        self._subsumed_idx = []
+
+    def issue_count(self):
+        return len(self.duplicates) + len(self.subsumed) + len(self.cycles) + len(self.dead)
+
+    def to_dict(self):
+        return {
+            "duplicates": [{"rule_id": r, "same_as": o} for r, o in self.duplicates],
+            "subsumed": [{"rule_id": r, "by": o} for r, o in self.subsumed],
+            "cycles": self.cycles,
+            "dead": [{"rule_id": r, "reason": why} for r, why in self.dead],
+            "unreachable": self.unreachable,
+            "strata": self.strata,
+            "acyclic": self.acyclic,
+        }
+
+    def lines(self):
+        out = [f"共 {self.strata} 层，{'无环，可单遍求值' if self.acyclic else '含环'}"]
+        out += [f"重复：规则 {r} 与规则 {o} 完全相同" for r, o in self.duplicates]
+        out += [f"冗余：规则 {r} 被条件更少的规则 {o} 包含" for r, o in self.subsumed]
+        out += [f"环：规则 {', '.join(map(str, ids))} 相互依赖" for ids in self.cycles]
+        out += [f"无效：规则 {r} {why}" for r, why in self.dead]
+        if self.unreachable:
+            out.append(f"无法推出的结论：{'、'.join(self.unreachable)}")
+        return out
+
+
+def analyze(rule_base=None, stratification=None, domain=database.DEFAULT_DOMAIN):
+    """批量检查整个规则库：重复、被包含、成环和永远不会触发的规则"""
+    rule_base = rule_base or get_rule_base(domain)
+    stratification = stratification or rule_base.cached("strata", Stratification)
+    rules = rule_base.rules
+    report = Report()
+    report.strata = len(stratification.strata)
+    report.acyclic = stratification.acyclic
+
+    # 重复与包含：只需比较结论相同的规则
+    for concl, group in rule_base.by_conclusion.items():
+        seen = {}
+        for idx in group:
+            key = frozenset(rules[idx][1])
+            if key in seen:
+                report._duplicate_idx.append((idx, seen[key]))
+            else:
+                seen[key] = idx
+        if len(seen) < 2:
+            continue
+        distinct = sorted(seen.items(), key=lambda kv: len(kv[0]))
+        for i, (bigger, idx) in enumerate(distinct):
+            by = [other for smaller, other in distinct[:i] if len(smaller) < len(bigger) and smaller <= bigger]
+            if by:
+                report._subsumed_idx.append((idx, min(by)))
+
+    # 环：条件与结论落在同一个强连通分量中的规则
+    comp = stratification.components
+    cycles = {}
+    for idx in stratification.recursive:
+        _, cond_list, concl = rules[idx]
+        if concl in cond_list:
+            report._dead_self.add(idx)
+            continue
+        cycles.setdefault(comp[concl], []).append(rules[idx][0])
+    report.cycles = list(cycles.values())
+
+    # 永远不会触发：从基础特征（没有规则能推出的特征）出发也满足不了全部条件
+    produced = set(rule_base.by_conclusion)
+    remaining = [len(cond_list) for _, cond_list, _ in rules]
+    reached = set()
+    queue = deque(f for f in rule_base.by_feature if f not in produced)
+    reached.update(queue)
+    while queue:
+        fact = queue.popleft()
+        for idx in rule_base.by_feature.get(fact, ()):
+            remaining[idx] -= 1
+            if remaining[idx] == 0 and idx not in report._dead_self:
+                concl = rules[idx][2]
+                if concl not in reached:
+                    reached.add(concl)
+                    queue.append(concl)
+    for idx, (rule_id, cond_list, concl) in enumerate(rules):
+        if idx in report._dead_self:
+            report.dead.append((rule_id, "的结论已经是它的条件，永远不会触发"))
+        elif remaining[idx]:
+            missing = next(c for c in cond_list if c not in reached)
+            report.dead.append((rule_id, f"的条件“{missing}”无法由基础特征推出"))
+    report.unreachable = sorted(c for c in produced if c not in reached)
+
+    report.duplicates = [(rules[i][0], rules[o][0]) for i, o in report._duplicate_idx]
+    report.subsumed = [(rules[i][0], rules[o][0]) for i, o in report._subsumed_idx]
+    return report
+
+
+def check_rule(conditions, conclusion, rule_base=None, rule_id=None, domain=database.DEFAULT_DOMAIN):
+    """保存单条规则前的检查，返回警告列表（空列表表示没有问题）
+
+    rule_id 为正在修改的规则，比较时忽略它本身；不给 rule_base 时使用领域 domain 的当前规则库。
+    """
+    rule_base = rule_base or get_rule_base(domain)
+    rules = rule_base.rules
+    conds = frozenset(database.split_conditions(conditions))
+    conclusion = conclusion.strip()
+    warnings = []
+    if conclusion in conds:
+        warnings.append("结论已经出现在条件中，这条规则永远不会触发")
+
+    for idx in rule_base.by_conclusion.get(conclusion, ()):
+        other_id, other_conds, _ = rules[idx]
+        if other_id == rule_id:
+            continue
+        other = frozenset(other_conds)
+        if other == conds:
+            warnings.append(f"与规则 {other_id} 完全相同")
+        elif other < conds:
+            warnings.append(f"被规则 {other_id} 包含（它的条件更少、结论相同），这条规则是多余的")
+        elif conds < other:
+            warnings.append(f"包含规则 {other_id}，保存后规则 {other_id} 将是多余的")
+
+    # 成环：从结论出发沿依赖图能回到某个条件
+    seen = {conclusion}
+    queue = deque([conclusion])
+    while queue:
+        fact = queue.popleft()
+        for idx in rule_base.by_feature.get(fact, ()):
+            if rules[idx][0] == rule_id:
+                continue
+            nxt = rules[idx][2]
+            if nxt in conds and nxt != conclusion:
+                warnings.append(f"会形成环：由结论“{conclusion}”又能推出条件“{nxt}”")
+                return warnings
+            if nxt not in seen:
+                seen.add(nxt)
+                queue.append(nxt)
+    return warnings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="规则库静态检查：重复、冗余、成环与永远不会触发的规则")
+    parser.add_argument("--db", default=database.DB_NAME, help="规则数据库路径")
+    parser.add_argument("--domain", default=database.DEFAULT_DOMAIN, help="规则库领域（默认 book）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    parser.add_argument("--strict", action="store_true", help="发现问题时返回非零退出码")
+    args = parser.parse_args(argv)
+
+    database.DB_NAME = args.db
+    database.init_db()
+    report = analyze(domain=args.domain)
+    if args.json:
+        json.dump(report.to_dict(), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        for line in report.lines():
+            print(line)
+    if args.strict and report.issue_count():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
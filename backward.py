@@ -0,0 +1,150 @@
+# backward.py
+from database import DEFAULT_DOMAIN
+from rule_base import get_rule_base
+
+
+class Proof:
+    """一个事实的证明：用户给出的特征（rule 为 None），或由某条规则从若干子证明推出"""
+
+    __slots__ = ("fact", "rule", "premises")
+
+    def __init__(self, fact, rule=None, premises=()):
+        self.fact = fact
+        self.rule = rule          # (rule_id, 条件元组, 结论)
+        self.premises = premises  # 各条件的 Proof
+
+    def steps(self):
+        """按推导顺序（先子目标后结论）返回推理过程，格式与 infer_book 相同"""
+        seen = set()
+        out = []
+        stack = [(self, False)]  # 显式栈，推理链再长也不会超出递归深度
+        while stack:
+            proof, expanded = stack.pop()
+            if expanded:
+                out.append(f"{'、'.join(proof.rule[1])} → {proof.fact}")
+                continue
+            if proof.rule is None or proof.fact in seen:
+                continue
+            seen.add(proof.fact)
+            stack.append((proof, True))
+            stack.extend((p, False) for p in reversed(proof.premises))
+        return out
+
+    def rule_ids(self):
+        ids = []
+        stack = [self]
+        while stack:
+            proof = stack.pop()
+            if proof.rule is not None and proof.rule[0] not in ids:
+                ids.append(proof.rule[0])
+            stack.extend(proof.premises)
+        return ids
+
+
+class Prover:
+    """反向推理：从目标出发只查看能推出它的规则，子目标的结果记表复用
+
+    同一个 Prover 可以连续证明多个目标，共享子目标表；遇到环时，
+    正在证明中的目标视为暂不成立，依赖它得到的失败结果不入表，避免错误剪枝。
+    """
+
+    def __init__(self, rule_base, features):
+        self.rule_base = rule_base
+        self.facts = frozenset(features)
+        self.table = {}            # 目标 -> Proof 或 None（已确定不成立）
+        self._in_progress = set()
+
+    def prove(self, goal):
+        proof, _ = self._prove(goal)
+        return proof
+
+    def _lookup(self, goal):
+        """不需要展开规则就能确定的结果 (证明或 None, 是否依赖进行中的目标)；需要展开时返回 None"""
+        if goal in self.facts:
+            return Proof(goal), False
+        if goal in self.table:
+            return self.table[goal], False
+        if goal in self._in_progress:
+            return None, True
+        return None
+
+    def _prove(self, goal):
+        """返回 (证明或 None, 结果是否依赖正在证明中的目标)
+
+        用显式栈代替递归（链式规则库的推理深度可达数千层）；
+        栈帧为 [目标, 候选规则, 当前规则下标, 已证明的条件, 是否依赖进行中的目标]。
+        """
+        found = self._lookup(goal)
+        if found is not None:
+            return found
+        rules = self.rule_base.rules
+        by_conclusion = self.rule_base.by_conclusion
+        self._in_progress.add(goal)
+        stack = [[goal, by_conclusion.get(goal, ()), 0, [], False]]
+        returned = None  # 刚出栈的子目标的结果
+        while stack:
+            frame = stack[-1]
+            goal, candidates, i, premises, depends = frame
+            if returned is not None:
+                sub, dep = returned
+                returned = None
+                depends = depends or dep
+                if sub is None:
+                    i, premises = i + 1, []
+                else:
+                    premises.append(sub)
+
+            result = pending = None
+            while i < len(candidates):
+                rule = rules[candidates[i]]
+                if len(premises) == len(rule[1]):
+                    result = Proof(goal, rule, tuple(premises))
+                    break
+                cond = rule[1][len(premises)]
+                found = self._lookup(cond)
+                if found is None:
+                    pending = cond
+                    break
+                sub, dep = found
+                depends = depends or dep
+                if sub is None:
+                    i, premises = i + 1, []
+                else:
+                    premises.append(sub)
+
+            if pending is not None:
+                # 子目标需要展开规则：保存当前进度，压栈
+                frame[2:] = [i, premises, depends]
+                self._in_progress.add(pending)
+                stack.append([pending, by_conclusion.get(pending, ()), 0, [], False])
+                continue
+
+            stack.pop()
+            self._in_progress.discard(goal)
+            if result is not None or not depends:
+                self.table[goal] = result
+                returned = (result, False)
+            else:
+                returned = (None, True)
+        return returned
+
+def prove(goal, features, domain=DEFAULT_DOMAIN):
+    """证明“由特征 features 能否推出 goal”，成立时返回 Proof，否则返回 None"""
+    return Prover(get_rule_base(domain), features).prove(goal)
+
+
+def which_hold(goals, features, domain=DEFAULT_DOMAIN):
+    """逐个检查候选目标，返回 {目标: Proof 或 None}；各目标共享子目标表"""
+    prover = Prover(get_rule_base(domain), features)
+    return {goal: prover.prove(goal) for goal in goals}
+
+
+def prove_book(goal, features, domain=DEFAULT_DOMAIN):
+    """返回与 infer_book 相同形式的 (推理过程, 结果)"""
+    rule_base = get_rule_base(domain)
+    proof = Prover(rule_base, features).prove(goal)
+    if proof is None:
+        return [], f"❌ 无法由当前条件推出：{goal}"
+    steps = proof.steps()
+    steps.append(f"✅ 目标成立：{goal}")
+    return steps, f"所识别的{rule_base.label}为：{goal}"
@@ -0,0 +1,192 @@
+# batch_cli.py
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+import database
+import snapshot
+
+
+def read_records(stream, fmt):
+    """逐条读取特征集合，不会一次载入整个文件
+
+    jsonl：每行是特征列表，或 {"features": [...]} 对象；
+    csv：每行一个查询，每个非空单元格是一个特征。
+    """
+    if fmt == "jsonl":
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            yield record.get("features", []) if isinstance(record, dict) else record
+    else:
+        for row in csv.reader(stream):
+            features = [cell.strip() for cell in row if cell.strip()]
+            if features:
+                yield features
+
+
+def chunked(records, size):
+    it = iter(records)
+    chunk_id = 0
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk_id, chunk
+        chunk_id += 1
+
+
+_snapshot_path = None
+_domain = database.DEFAULT_DOMAIN
+_matrix = None
+
+
+def _init_worker(db_name, snapshot_path=None, domain=database.DEFAULT_DOMAIN):
+    global _snapshot_path, _domain
+    # 主进程在创建进程池前已经打开过数据库：不要沿用 fork 继承来的连接（WAL 模式下跨进程共用会损坏锁状态）
+    database.discard_connection()
+    database.DB_NAME = db_name
+    _snapshot_path = snapshot_path
+    _domain = domain
+
+
+def _worker_matrix():
+    """工作进程用 mmap 打开规则库快照，各进程共享同一份规则数据；规则变化后重新打开"""
+    global _matrix
+    if _matrix is None or not _matrix.snapshot.is_current():
+        from batch_engine import RuleMatrix  # numpy 仅在批量推理时需要
+        _matrix = RuleMatrix.from_snapshot(snapshot.open_snapshot(_snapshot_path, domain=_domain),
+                                           database.domain_label(_domain))
+    return _matrix
+
+
+def infer_chunk(chunk_id, start, records, explain=True):
+    """在工作进程中推理一个分块；explain 为假时只输出结论和触发的规则，不生成推理过程的文字"""
+    lines = []
+    for offset, (features, proof) in enumerate(zip(records, _worker_matrix().prove(records))):
+        record = {"index": start + offset, "features": features}
+        record.update(proof.to_dict())
+        if explain:
+            record["steps"], record["result"] = proof.render()
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return chunk_id, "\n".join(lines) + "\n"
+
+
+class Checkpoint:
+    """记录已经写入输出的分块，崩溃后可从断点继续（同一分块至多重复写一次）"""
+
+    def __init__(self, path, chunk_size):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.done = set()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return self
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("chunk_size") != self.chunk_size:
+            raise SystemExit(f"断点文件的分块大小为 {data.get('chunk_size')}，与本次的 {self.chunk_size} 不一致")
+        self.done = set(data.get("done", []))
+        return self
+
+    def mark(self, chunk_id):
+        self.done.add(chunk_id)
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"chunk_size": self.chunk_size, "done": sorted(self.done)}, f)
+        os.replace(tmp, self.path)
+
+
+def run(input_stream, output, fmt="jsonl", workers=None, chunk_size=1000, ordered=True,
+        checkpoint=None, db_name=None, explain=True, domain=database.DEFAULT_DOMAIN):
+    """把输入流中的特征集合分块分发到进程池，在领域 domain 的规则库上推理，边算边写出，返回处理的分块数"""
+    workers = workers or os.cpu_count() or 1
+    checkpoint = checkpoint or Checkpoint(None, chunk_size)
+    max_inflight = workers * 2  # 限制同时在途的分块数，内存占用与输入大小无关
+    pending = deque()
+    processed = 0
+
+    def write(chunk_id, text):
+        output.write(text)
+        output.flush()
+        checkpoint.mark(chunk_id)
+
+    db_name = db_name or database.DB_NAME
+    snapshot_path = snapshot.snapshot_path(db_name, domain)
+    if db_name == database.DB_NAME:
+        snapshot.ensure_snapshot(snapshot_path, domain)  # 先在主进程重建过期的快照，工作进程只需打开
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(db_name, snapshot_path, domain)) as pool:
+        for chunk_id, chunk in chunked(read_records(input_stream, fmt), chunk_size):
+            if chunk_id in checkpoint.done:
+                continue
+            pending.append(pool.submit(infer_chunk, chunk_id, chunk_id * chunk_size, chunk, explain))
+            processed += 1
+            while len(pending) >= max_inflight:
+                _drain(pending, write, ordered)
+        while pending:
+            _drain(pending, write, ordered)
+    return processed
+
+
+def _drain(pending, write, ordered):
+    if ordered:
+        # 按提交顺序输出：只等待最早的分块
+        write(*pending.popleft().result())
+        return
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+        write(*future.result())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量离线推理：从 CSV / JSONL 文件或标准输入流式读取特征集合")
+    parser.add_argument("input", help="输入文件路径，- 表示标准输入")
+    parser.add_argument("-o", "--output", default="-", help="输出 JSONL 文件路径（默认标准输出）")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="输入格式（默认按扩展名判断）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="进程数（默认 CPU 核数）")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每个分块的查询数")
+    parser.add_argument("--unordered", action="store_true", help="哪个分块先算完就先输出")
+    parser.add_argument("--checkpoint", help="断点文件路径；再次运行时跳过已完成的分块并追加输出")
+    parser.add_argument("--db", default=database.DB_NAME, help="规则数据库路径")
+    parser.add_argument("--domain", default=database.DEFAULT_DOMAIN, help="规则库领域（默认 book）")
+    parser.add_argument("--conclusions-only", action="store_true", help="只输出结论和触发的规则 ID，不输出推理过程")
+    args = parser.parse_args(argv)
+
+    database.DB_NAME = args.db
+    database.init_db()
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    checkpoint = Checkpoint(args.checkpoint, args.chunk_size).load()
+    if args.input == "-":
+        input_stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    else:
+        input_stream = open(args.input, encoding="utf-8", newline="")
+    if args.output == "-":
+        output = sys.stdout
+    else:
+        # 从断点继续时追加，避免覆盖已经写出的结果
+        output = open(args.output, "a" if checkpoint.done else "w", encoding="utf-8")
+
+    with input_stream:
+        count = run(input_stream, output, fmt, args.workers, args.chunk_size,
+                    ordered=not args.unordered, checkpoint=checkpoint, db_name=args.db,
+                    explain=not args.conclusions_only, domain=args.domain)
+    if output is not sys.stdout:
+        output.close()
+    print(f"✅ 已处理 {count} 个分块", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
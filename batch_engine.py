@@ -0,0 +1,168 @@
+# batch_engine.py
+import numpy as np
+from database import DEFAULT_DOMAIN
+from proof import ProofGraph, RuleRefs
+from rule_base import get_rule_base
+
+# 一轮匹配中临时数组的内存上限（字节）：每个查询要为每个条件、每条规则各分配若干字节，
+# 一次同时推理的查询数由它和规则库大小决定，规则再多也不会因为分块过大而耗尽内存
+MEMORY_BUDGET = 256 * 1024 * 1024
+
+
+class _Producers:
+    """结论 -> 能推出它的规则下标（按规则顺序），由矩阵中按结论排序的规则下标二分得到"""
+
+    def __init__(self, matrix):
+        self._matrix = matrix
+
+    def get(self, fact, default=()):
+        matrix = self._matrix
+        col = matrix.fact_index.get(fact)
+        if col is None:
+            return default
+        lo, hi = np.searchsorted(matrix.sorted_concl, [col, col + 1])
+        return matrix.by_concl[lo:hi].tolist() if hi > lo else default
+
+
+class RuleMatrix:
+    """把规则表编译成 规则 × 事实 的关联矩阵（按 CSR 形式存放条件列）
+
+    同时提供 rules、by_feature、by_conclusion 与 label，可作为证明图 ProofGraph 的规则库。
+    """
+
+    def __init__(self, rule_base):
+        self.rules = rule_base.rules
+        self.label = rule_base.label
+        self.by_feature = rule_base.by_feature
+        self.by_conclusion = rule_base.by_conclusion
+        self.fact_index = {}
+        self.facts = []
+        cond_cols, offsets, concl_cols = [], [], []
+        for _, cond_list, concl in rule_base.rules:
+            offsets.append(len(cond_cols))
+            cond_cols.extend(self._column(c) for c in cond_list)
+            concl_cols.append(self._column(concl))
+
+        self._build(np.asarray(cond_cols, dtype=np.intp), np.asarray(offsets, dtype=np.intp),
+                    np.asarray(concl_cols, dtype=np.intp))
+
+    @classmethod
+    def from_snapshot(cls, snap, label="图书"):
+        """直接以 mmap 打开的规则库快照为底：条件、结论数组零拷贝，多个进程共享同一份物理内存"""
+        matrix = cls.__new__(cls)
+        matrix.label = label
+        matrix.fact_index = snap.string_index
+        matrix.facts = snap.strings
+        matrix.rules = snap.rules
+        matrix.by_feature = snap.condition_facts
+        matrix.by_conclusion = _Producers(matrix)
+        matrix.snapshot = snap
+
+        def view(name, dtype):
+            offset, count, _ = snap.sections[name]
+            return np.frombuffer(snap._mmap, dtype=dtype, count=count, offset=offset)
+
+        matrix._build(view("cond_ids", "<i4"), view("cond_offsets", "<i8")[:-1], view("conclusions", "<i4"))
+        return matrix
+
+    def _build(self, cond_cols, offsets, concl_cols):
+        self.cond_cols = cond_cols
+        self.offsets = offsets
+        self.cond_lens = np.diff(np.append(self.offsets, len(cond_cols)))
+        self.concl_cols = concl_cols
+
+        # 同一结论的规则按原顺序排在一起，用于“同一轮只由第一条规则推出”
+        self.by_concl = np.lexsort((np.arange(len(concl_cols)), self.concl_cols))
+        self.sorted_concl = sorted_concl = self.concl_cols[self.by_concl]
+        group_start = np.ones(len(sorted_concl), dtype=bool)
+        group_start[1:] = sorted_concl[1:] != sorted_concl[:-1]
+        self.group_start = np.flatnonzero(group_start)
+        self.group_of = np.cumsum(group_start) - 1
+
+    @classmethod
+    def from_database(cls, domain=DEFAULT_DOMAIN):
+        """返回领域当前规则库对应的矩阵（同一版本的规则库只编译一次）"""
+        return get_rule_base(domain).cached("matrix", cls)
+
+    def _column(self, fact):
+        col = self.fact_index.get(fact)
+        if col is None:
+            col = self.fact_index[fact] = len(self.facts)
+            self.facts.append(fact)
+        return col
+
+    def _encode(self, feature_sets):
+        known = np.zeros((len(feature_sets), len(self.facts)), dtype=bool)
+        for q, features in enumerate(feature_sets):
+            cols = [self.fact_index[f] for f in features if f in self.fact_index]
+            known[q, cols] = True
+        return known
+
+    def _first_per_conclusion(self, fire):
+        """同一查询在同一轮中，一个结论只保留规则序号最小的那条"""
+        fire_sorted = fire[:, self.by_concl].astype(np.int32)
+        running = np.cumsum(fire_sorted, axis=1)
+        before_group = np.concatenate(
+            [np.zeros((fire.shape[0], 1), dtype=np.int32), running[:, :-1]], axis=1
+        )[:, self.group_start]
+        first = (fire_sorted == 1) & (running - before_group[:, self.group_of] == 1)
+        keep = np.zeros_like(fire)
+        keep[:, self.by_concl] = first
+        return keep
+
+    def queries_per_pass(self):
+        """在 MEMORY_BUDGET 内一次能同时推理的查询数
+
+        每个查询的临时数组：已知事实 2 × 事实数、取出的条件列 1 × 条件数，
+        以及按规则计算的计数、排序、累加等约 32 × 规则数字节。
+        """
+        per_query = 2 * len(self.facts) + len(self.cond_cols) + 32 * len(self.concl_cols)
+        return max(1, MEMORY_BUDGET // max(per_query, 1))
+
+    def saturate(self, feature_sets):
+        """对一批查询同时做前向推理直到不动点，返回每个查询按顺序触发的规则下标
+
+        查询数超过 queries_per_pass() 时分成几批依次推理。
+        """
+        step = self.queries_per_pass()
+        if len(feature_sets) <= step:
+            return self._saturate(feature_sets)
+        fired = []
+        for start in range(0, len(feature_sets), step):
+            fired += self._saturate(feature_sets[start:start + step])
+        return fired
+
+    def _saturate(self, feature_sets):
+        known = self._encode(feature_sets)
+        fired = [[] for _ in feature_sets]
+        if len(self.concl_cols) == 0 or not len(feature_sets):
+            return fired
+
+        active = np.arange(len(feature_sets))
+        while len(active):
+            sub = known[active]
+            matched = np.add.reduceat(sub[:, self.cond_cols], self.offsets, axis=1, dtype=np.int32) == self.cond_lens
+            fire = matched & ~sub[:, self.concl_cols]
+            fire = self._first_per_conclusion(fire)
+            q_idx, r_idx = np.nonzero(fire)
+            if not len(q_idx):
+                break
+            known[active[q_idx], self.concl_cols[r_idx]] = True
+            for q, r in zip(active[q_idx].tolist(), r_idx.tolist()):
+                fired[q].append(r)
+            active = active[np.unique(q_idx)]
+        return fired
+
+    def prove(self, feature_sets, chunk_size=4096):
+        """返回每组特征的证明图 ProofGraph；只需要结论的调用方不必生成推理过程的文字"""
+        feature_sets = [list(fs) for fs in feature_sets]
+        proofs = []
+        for start in range(0, len(feature_sets), chunk_size):
+            chunk = feature_sets[start:start + chunk_size]
+            for features, fired in zip(chunk, self.saturate(chunk)):
+                proofs.append(ProofGraph(features, RuleRefs(self.rules, fired), self))
+        return proofs
+
+    def infer(self, feature_sets, chunk_size=4096):
+        """返回与 infer_book 相同形式的 (推理过程, 结果) 列表"""
+        return [proof.render() for proof in self.prove(feature_sets, chunk_size)]
@@ -0,0 +1,280 @@
+# benchmark.py
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import database
+
+SHAPES = ("fan_in", "chain", "shared", "cyclic")
+
+
+# ===== 合成规则库 =====
+
+def generate_rules(shape, n, seed=42):
+    """生成 n 条指定形状的规则 [(条件字符串, 结论)]
+
+    fan_in：每条规则有很多条件（宽扇入）；
+    chain：像动物识别那样逐层推出中间结论的深链；
+    shared：所有规则从一个很小的特征集合里取条件；
+    cyclic：深链的末端结论又作为链头的条件，形成环。
+    """
+    rnd = random.Random(seed)
+    features = [f"特征{i}" for i in range(max(8, int(n ** 0.5) * 4))]
+    rules = []
+    if shape == "fan_in":
+        for i in range(n):
+            conds = rnd.sample(features, min(len(features), rnd.randint(5, 10)))
+            rules.append((",".join(conds), f"结论{i}"))
+    elif shape in ("chain", "cyclic"):
+        depth = 6
+        for i in range(n):
+            chain, level = divmod(i, depth)
+            if level == 0:
+                conds = rnd.sample(features, 2)
+                if shape == "cyclic":
+                    conds.append(f"链{chain}-{depth - 1}")
+            else:
+                conds = [f"链{chain}-{level - 1}", rnd.choice(features)]
+            rules.append((",".join(conds), f"链{chain}-{level}"))
+    elif shape == "shared":
+        shared = features[:12]
+        for i in range(n):
+            rules.append((",".join(rnd.sample(shared, 3)), f"结论{i}"))
+    else:
+        raise ValueError(f"未知的规则形状：{shape}")
+    return rules
+
+
+def generate_queries(rules, count, seed=7):
+    """从规则的条件中抽特征作为查询，保证有一部分查询能命中规则"""
+    rnd = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        conds = rnd.choice(rules)[0].split(",")
+        extra = rnd.choice(rules)[0].split(",")
+        queries.append(sorted(set(conds + rnd.sample(extra, min(2, len(extra))))))
+    return queries
+
+
+def bulk_load(rules):
+    """在一个事务中批量写入规则（含条件索引）"""
+    database.import_rules(rules)
+
+
+# ===== 测量 =====
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def _latency_stats(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 4),
+        "throughput_qps": round(len(samples) / sum(samples), 1) if sum(samples) else None,
+    }
+
+
+def bench_inference(queries):
+    from rules_engine import infer_book, configure_cache
+    from rule_base import get_rule_base
+
+    compile_time, _ = _timed(get_rule_base)
+    configure_cache(maxsize=0)  # 关闭结果缓存，测的是推理本身
+    samples = [_timed(infer_book, q)[0] for q in queries]
+    configure_cache(maxsize=4096)
+    return {"compile_s": round(compile_time, 4), "infer_book": _latency_stats(samples)}
+
+
+def bench_session(queries):
+    from rete import ReteNetwork
+    network = ReteNetwork.from_database()
+    samples = []
+    for q in queries:
+        session = network.new_session()
+        for f in q:
+            samples.append(_timed(session.assert_fact, f)[0])
+    return {"assert_fact": _latency_stats(samples)}
+
+
+def bench_batch(queries):
+    try:
+        from rules_engine import infer_book_batch
+        elapsed, _ = _timed(infer_book_batch, queries)
+    except ImportError as e:
+        return {"skipped": str(e)}
+    return {"total_s": round(elapsed, 4), "throughput_qps": round(len(queries) / elapsed, 1)}
+
+
+def bench_database(rules, crud_ops):
+    load_time, _ = _timed(bulk_load, rules)
+    read_time, rows = _timed(database.get_all_rules)
+    sample = rules[:crud_ops]
+    add = [_timed(database.add_rule, c, k)[0] for c, k in sample]
+    ids = [r[0] for r in database.get_all_rules()[-len(sample):]]
+    update = [_timed(database.update_rule, i, c, k)[0] for i, (c, k) in zip(ids, sample)]
+    lookup = [_timed(database.get_rules_by_feature, c.split(",")[0])[0] for c, _ in sample]
+    delete = [_timed(database.delete_rule, i)[0] for i in ids]
+    return {
+        "bulk_load_s": round(load_time, 4),
+        "bulk_load_rows_per_s": round(len(rules) / load_time, 1) if load_time else None,
+        "get_all_rules_s": round(read_time, 4),
+        "add_rule": _latency_stats(add),
+        "update_rule": _latency_stats(update),
+        "get_rules_by_feature": _latency_stats(lookup),
+        "delete_rule": _latency_stats(delete),
+    }
+
+
+def bench_graph(max_nodes, workdir):
+    try:
+        import knowledge_graph as kg
+    except ImportError as e:
+        return {"skipped": str(e)}
+    from rule_base import get_rule_base
+    G = kg.build_graph(get_rule_base().rules)
+    result = {"nodes": len(G.nodes), "edges": len(G.edges)}
+    result["layered_layout_s"] = round(_timed(kg.layered_layout, G)[0], 4)
+    if len(G.nodes) <= max_nodes:
+        kg.OUTPUT_PATH = os.path.join(workdir, "graph.png")
+        kg.LAYOUT_CACHE_PATH = os.path.join(workdir, "graph.json")
+        try:
+            result["spring_layout_s"] = round(_timed(kg.incremental_layout, G, {})[0], 4)
+            result["render_s"] = round(_timed(kg.show_graph)[0], 4)
+        except ImportError as e:  # 节点数超过 500 时 networkx 的 spring 布局需要 scipy
+            result["spring_layout_s"] = None
+            result["skipped"] = str(e)
+    else:
+        result["spring_layout_s"] = None  # 节点太多，O(n²) 布局不再测量
+    return result
+
+
+def bench_gui_startup(db_path):
+    if sys.platform != "win32" and not os.environ.get("DISPLAY"):
+        return {"skipped": "没有图形界面（DISPLAY 未设置）"}
+    here = os.path.dirname(os.path.abspath(__file__))
+    report_path = os.path.join(os.path.dirname(db_path), "startup.json")
+    env = dict(os.environ, PYTHONPATH=here)
+    subprocess.run([sys.executable, os.path.join(here, "main.py"), "--startup-report", "--report-json", report_path],
+                   cwd=os.path.dirname(db_path), env=env, check=True, capture_output=True, timeout=600)
+    with open(report_path, encoding="utf-8") as f:
+        report = json.load(f)
+    return {"phases_ms": report["phases_ms"], "total_ms": report["total_ms"]}
+
+
+def run_case(shape, size, queries, crud_ops, graph_max_nodes, gui):
+    rules = generate_rules(shape, size)
+    qs = generate_queries(rules, queries)
+    with tempfile.TemporaryDirectory() as workdir:
+        old_db = database.DB_NAME
+        database.DB_NAME = os.path.join(workdir, "system.db")
+        try:
+            database.init_db()
+            with database.get_connection() as conn:  # 不要示例规则
+                conn.execute("DELETE FROM rule_conditions")
+                conn.execute("DELETE FROM rules")
+            case = {"shape": shape, "size": size}
+            case["database"] = bench_database(rules, crud_ops)
+            case["inference"] = bench_inference(qs)
+            case["session"] = bench_session(qs[: max(1, queries // 10)])
+            case["batch"] = bench_batch(qs)
+            case["graph"] = bench_graph(graph_max_nodes, workdir)
+            if gui:
+                case["gui_startup"] = bench_gui_startup(database.DB_NAME)
+        finally:
+            database.close_connection()
+            database.DB_NAME = old_db
+    return case
+
+
+# ===== 基线保存与比较 =====
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _flatten(data, prefix=""):
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from _flatten(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(baseline, current, threshold=0.2):
+    """比较两次结果中以 _s / _ms 结尾的耗时指标，返回变慢超过阈值的项"""
+    old = {f"{c['shape']}/{c['size']}": dict(_flatten(c)) for c in baseline["cases"]}
+    regressions = []
+    for case in current["cases"]:
+        key = f"{case['shape']}/{case['size']}"
+        for name, value in _flatten(case):
+            if not name.endswith(("_s", "_ms")) or name not in old.get(key, {}):
+                continue
+            before = old[key][name]
+            if before and value > before * (1 + threshold):
+                regressions.append((key, name, before, value))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="性能基准：推理、数据库、知识图谱与界面启动")
+    parser.add_argument("--shapes", nargs="+", default=list(SHAPES), choices=SHAPES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000, 10000],
+                        help="规则条数（可到 1000000）")
+    parser.add_argument("--queries", type=int, default=500, help="每个用例的推理查询数")
+    parser.add_argument("--crud-ops", type=int, default=50, help="每个用例的单条增删改次数")
+    parser.add_argument("--graph-max-nodes", type=int, default=2000, help="超过该节点数时不再测量 spring 布局和渲染")
+    parser.add_argument("--gui", action="store_true", help="同时测量界面冷启动时间")
+    parser.add_argument("-o", "--output", help="结果 JSON 路径（默认 benchmarks/<提交号>.json）")
+    parser.add_argument("--compare", help="与之前保存的基线 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为性能回退的变慢比例（默认 0.2）")
+    args = parser.parse_args(argv)
+
+    result = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": [],
+    }
+    for shape in args.shapes:
+        for size in args.sizes:
+            print(f"▶ {shape} × {size}", file=sys.stderr)
+            result["cases"].append(run_case(shape, size, args.queries, args.crud_ops, args.graph_max_nodes, args.gui))
+
+    output = args.output or os.path.join("benchmarks", f"{result['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"✅ 基准结果已保存到: {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        for key, name, before, after in regressions:
+            print(f"⚠ {key} {name}: {before} → {after}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("✅ 没有发现性能回退", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
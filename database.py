@@ -1,62 +1,572 @@
 # database.py
 import sqlite3
+import threading
+from concurrent.futures import CancelledError
+import profiling
 
 DB_NAME = "system.db"
 
+DEFAULT_DOMAIN = "book"
+
+# 示例领域：名称 -> (显示名, 示例规则, 特征词表)
+# 动物识别规则与词表迁移自 production-example.py
+SAMPLE_DOMAINS = {
+    "book": ("图书", [
+        ('科幻,外国作家,20世纪', '《基地》'),
+        ('文学,外国作家,19世纪', '《悲惨世界》'),
+        ('哲学,古代,外国作家', '《理想国》'),
+        ('悬疑,外国作家,现代', '《福尔摩斯探案集》'),
+        ('科技,非虚构,现代', '《人类简史》'),
+    ], []),
+    "animal": ("动物", [
+        ('有毛发', '哺乳类'),
+        ('产奶', '哺乳类'),
+        ('有羽毛', '鸟类'),
+        ('不会飞,会下蛋', '鸟类'),
+        ('吃肉,哺乳类', '食肉类'),
+        ('有犬齿,有爪,眼盯前方', '食肉类'),
+        ('有蹄,哺乳类', '蹄类'),
+        ('反刍,哺乳类', '蹄类'),
+        ('食肉类,黄褐色,哺乳类,有斑点', '金钱豹'),
+        ('食肉类,黄褐色,哺乳类,有黑色条纹', '虎'),
+        ('有黑色条纹,蹄类', '斑马'),
+        ('蹄类,有斑点,长脖,长腿', '长颈鹿'),
+        ('鸟类,不会飞,长脖,长腿', '鸵鸟'),
+        ('鸟类,不会飞,会游泳,黑白二色', '企鹅'),
+        ('鸟类,善飞', '信天翁'),
+    ], list({
+        '1': '有毛发', '2': '产奶', '3': '有羽毛', '4': '不会飞', '5': '会下蛋', '6': '吃肉', '7': '有犬齿',
+        '8': '有爪', '9': '眼盯前方', '10': '有蹄', '11': '反刍', '12': '黄褐色', '13': '有斑点', '14': '有黑色条纹',
+        '15': '长脖', '16': '长腿', '17': '不会飞', '18': '会游泳', '19': '黑白二色', '20': '善飞', '21': '哺乳类',
+        '22': '鸟类', '23': '食肉类', '24': '蹄类', '25': '金钱豹', '26': '虎', '27': '长颈鹿', '28': '斑马',
+        '29': '鸵鸟', '30': '企鹅', '31': '信天翁',
+    }.items())),
+}
+
+# 每个线程复用一个连接，避免每次操作都重新打开数据库
+_local = threading.local()
+
+# 规则版本号：本进程写规则时递增；其它连接 / 进程的提交通过 PRAGMA data_version 发现
+_version = 0
+_version_lock = threading.Lock()
+
+
 def get_connection():
-    return sqlite3.connect(DB_NAME)
+    """返回当前线程复用的连接（WAL 模式：界面修改规则时不阻塞并发读取）"""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.db_name != DB_NAME:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(DB_NAME, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        _local.conn = conn
+        _local.db_name = DB_NAME
+    return conn
+
+
+def close_connection():
+    """关闭当前线程的连接（线程结束或切换数据库前调用）"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+def discard_connection():
+    """丢弃（不关闭）当前线程的连接：fork 出的子进程既不能使用、也不能关闭从父进程继承来的连接"""
+    _local.conn = None
+
+
+def _bump_version():
+    global _version
+    with _version_lock:
+        _version += 1
+
+
+def rules_version():
+    """返回当前规则版本号，规则被任何连接修改后都会变化"""
+    data_version = get_connection().execute("PRAGMA data_version").fetchone()[0]
+    if getattr(_local, "data_version", None) != (_local.db_name, data_version):
+        # 首次在本线程检查、或其它连接提交过修改时，都视为版本可能已变
+        _local.data_version = (_local.db_name, data_version)
+        _bump_version()
+    return _version
+
+
+def stored_version(domain=None):
+    """返回数据库中持久化的规则版本号（跨进程、跨重启有效）；给出 domain 时为该领域的版本号"""
+    key = "version" if domain is None else f"version:{domain}"
+    row = get_connection().execute("SELECT value FROM rules_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+
+# 规则全文索引（FTS5 外部内容表）：表名 -> 分词器
+# rules_fts 用 trigram 支持不短于 3 个字的中文子串；rules_words 用 unicode61 按逗号、标点切成整个特征 / 书名，
+# 供更短的词做前缀查询（特征大多只有两个字，trigram 索引无法检索）
+FTS_TABLES = {"rules_fts": "trigram", "rules_words": "unicode61"}
+
+
+def _create_rules_fts(cursor):
+    for name, tokenizer in FTS_TABLES.items():
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+        if cursor.fetchone() is not None:
+            continue
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE {name} USING fts5(
+                conditions, conclusion, content='rules', content_rowid='id', tokenize='{tokenizer}'
+            )
+        ''')
+        # 逐行写入全文索引时 FTS5 每条语句都会落一个新段，批量导入改为导入结束后一条语句补齐（见 import_rules）
+        cursor.execute(f'''
+            CREATE TRIGGER {name}_insert AFTER INSERT ON rules
+            WHEN NOT EXISTS (SELECT 1 FROM rules_meta WHERE key = 'fts_deferred')
+            BEGIN
+                INSERT INTO {name} (rowid, conditions, conclusion) VALUES (NEW.id, NEW.conditions, NEW.conclusion);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER {name}_delete AFTER DELETE ON rules BEGIN
+                INSERT INTO {name} ({name}, rowid, conditions, conclusion)
+                VALUES ('delete', OLD.id, OLD.conditions, OLD.conclusion);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER {name}_update AFTER UPDATE OF conditions, conclusion ON rules BEGIN
+                INSERT INTO {name} ({name}, rowid, conditions, conclusion)
+                VALUES ('delete', OLD.id, OLD.conditions, OLD.conclusion);
+                INSERT INTO {name} (rowid, conditions, conclusion) VALUES (NEW.id, NEW.conditions, NEW.conclusion);
+            END
+        ''')
+        cursor.execute(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")  # 为已有规则建立索引
+
 
+def split_conditions(conditions):
+    """把逗号分隔的条件拆成去空白、去重后的列表"""
+    return list(dict.fromkeys(c.strip() for c in conditions.split(',') if c.strip()))
+
+
+def _sync_conditions(cursor, rule_id, conditions):
+    cursor.execute("DELETE FROM rule_conditions WHERE rule_id=?", (rule_id,))
+    cursor.executemany(
+        "INSERT INTO rule_conditions (rule_id, feature) VALUES (?, ?)",
+        [(rule_id, f) for f in split_conditions(conditions)]
+    )
+
+
+@profiling.timed_db
 def init_db():
     conn = get_connection()
-    cursor = conn.cursor()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conditions TEXT,
+                conclusion TEXT
+            )
+        ''')
+        # 规范化的条件索引：一条规则的每个条件一行，便于按特征查规则
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rule_conditions (
+                rule_id INTEGER NOT NULL REFERENCES rules(id) ON DELETE CASCADE,
+                feature TEXT NOT NULL,
+                PRIMARY KEY (rule_id, feature)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_rule_conditions_feature ON rule_conditions (feature, rule_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_rules_conclusion ON rules (conclusion)")
+
+        # 规则库按领域（图书、动物……）分开，各自编译索引、缓存推理结果
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(rules)")]
+        if "domain" not in columns:
+            cursor.execute(f"ALTER TABLE rules ADD COLUMN domain TEXT NOT NULL DEFAULT '{DEFAULT_DOMAIN}'")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_rules_domain ON rules (domain, id)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS domains (name TEXT PRIMARY KEY, label TEXT NOT NULL)")
+        # 领域的特征词表：编号 -> 特征（如动物识别系统中输入的数字）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vocabulary (
+                domain TEXT NOT NULL,
+                code TEXT NOT NULL,
+                feature TEXT NOT NULL,
+                PRIMARY KEY (domain, code)
+            ) WITHOUT ROWID
+        ''')
+
+        # 持久化的规则版本号（全局与每个领域各一个）：任何连接（包括外部工具）改动规则表
+        # 都会由触发器加一，用来判断磁盘上的规则库快照和各领域的缓存是否过期
+        cursor.execute("CREATE TABLE IF NOT EXISTS rules_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        cursor.execute("INSERT OR IGNORE INTO rules_meta (key, value) VALUES ('version', 0)")
+        for event, rows in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+            cursor.execute(f"DROP TRIGGER IF EXISTS rules_version_{event.lower()}")  # 旧版本只有全局版本号
+            # 领域版本号用 UPSERT：新领域的第一条规则同时建立它的版本号（比先插入再 UPDATE ... IN 快一倍）
+            bumps = "".join(f"INSERT INTO rules_meta (key, value) VALUES ('version:' || {row}.domain, 1) "
+                            f"ON CONFLICT (key) DO UPDATE SET value = value + 1;" for row in rows)
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS rules_meta_{event.lower()} AFTER {event} ON rules
+                BEGIN
+                    UPDATE rules_meta SET value = value + 1 WHERE key = 'version';
+                    {bumps}
+                END
+            ''')
+
+        # 迁移旧数据库：为还没有条件索引的规则补齐
+        cursor.execute("SELECT id, conditions FROM rules WHERE id NOT IN (SELECT rule_id FROM rule_conditions)")
+        for rule_id, conditions in cursor.fetchall():
+            _sync_conditions(cursor, rule_id, conditions or "")
+
+        # 规则全文索引：规则管理窗口按条件 / 结论搜索；SQLite 未编译 FTS5 时跳过，搜索退回 LIKE
+        try:
+            _create_rules_fts(cursor)
+        except sqlite3.OperationalError:
+            pass
+
+        # 示例规则初始化：领域第一次创建且还没有规则时写入
+        for domain, (label, sample_rules, vocabulary) in SAMPLE_DOMAINS.items():
+            cursor.execute("INSERT OR IGNORE INTO domains (name, label) VALUES (?, ?)", (domain, label))
+            if not cursor.rowcount:
+                continue
+            cursor.execute("SELECT 1 FROM rules WHERE domain = ? LIMIT 1", (domain,))
+            if cursor.fetchone() is None:
+                for conditions, conclusion in sample_rules:
+                    cursor.execute("INSERT INTO rules (conditions, conclusion, domain) VALUES (?, ?, ?)",
+                                   (conditions, conclusion, domain))
+                    _sync_conditions(cursor, cursor.lastrowid, conditions)
+            cursor.executemany("INSERT OR IGNORE INTO vocabulary (domain, code, feature) VALUES (?, ?, ?)",
+                               [(domain, code, feature) for code, feature in vocabulary])
+    _bump_version()
+
+
+@profiling.timed_db
+def get_all_rules(domain=DEFAULT_DOMAIN):
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT id, conditions, conclusion FROM rules WHERE domain = ? ORDER BY id", (domain,))
+    return cursor.fetchall()
+
+
+@profiling.timed_db
+def get_rules_by_feature(feature, domain=DEFAULT_DOMAIN):
+    """返回条件中包含该特征的所有规则（走 rule_conditions 索引，无需全表扫描）"""
+    cursor = get_connection().cursor()
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS rules (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            conditions TEXT,
-            conclusion TEXT
-        )
-    ''')
-    conn.commit()
-
-    # 示例规则初始化
-    cursor.execute("SELECT COUNT(*) FROM rules")
-    if cursor.fetchone()[0] == 0:
-        sample_rules = [
-            ('科幻,外国作家,20世纪', '《基地》'),
-            ('文学,外国作家,19世纪', '《悲惨世界》'),
-            ('哲学,古代,外国作家', '《理想国》'),
-            ('悬疑,外国作家,现代', '《福尔摩斯探案集》'),
-            ('科技,非虚构,现代', '《人类简史》'),
-        ]
-        cursor.executemany("INSERT INTO rules (conditions, conclusion) VALUES (?, ?)", sample_rules)
-        conn.commit()
-    conn.close()
+        SELECT r.id, r.conditions, r.conclusion
+        FROM rule_conditions rc JOIN rules r ON r.id = rc.rule_id
+        WHERE rc.feature = ? AND r.domain = ?
+        ORDER BY r.id
+    ''', (feature.strip(), domain))
+    return cursor.fetchall()
+
+
+@profiling.timed_db
+def get_domains():
+    """返回 [(领域名, 显示名)]"""
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT name, label FROM domains ORDER BY name")
+    return cursor.fetchall()
+
+
+def has_domain(domain):
+    return get_connection().execute("SELECT 1 FROM domains WHERE name = ?", (domain,)).fetchone() is not None
 
-def get_all_rules():
+
+def domain_label(domain):
+    """领域的显示名（如“图书”“动物”），用于推理结果的文字"""
+    row = get_connection().execute("SELECT label FROM domains WHERE name = ?", (domain,)).fetchone()
+    return row[0] if row else domain
+
+
+@profiling.timed_db
+def get_vocabulary(domain=DEFAULT_DOMAIN):
+    """返回领域的特征词表 [(编号, 特征)]，按编号排序"""
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT code, feature FROM vocabulary WHERE domain = ?", (domain,))
+    return sorted(cursor.fetchall(), key=lambda row: (not row[0].isdigit(), int(row[0]) if row[0].isdigit() else 0, row[0]))
+
+
+@profiling.timed_db
+def add_rule(conditions, conclusion, domain=DEFAULT_DOMAIN):
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM rules")
-    data = cursor.fetchall()
-    conn.close()
-    return data
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT OR IGNORE INTO domains (name, label) VALUES (?, ?)", (domain, domain))
+        cursor.execute("INSERT INTO rules (conditions, conclusion, domain) VALUES (?, ?, ?)",
+                       (conditions, conclusion, domain))
+        rule_id = cursor.lastrowid
+        _sync_conditions(cursor, rule_id, conditions)
+    _bump_version()
+    return rule_id
+
 
-def add_rule(conditions, conclusion):
+@profiling.timed_db
+def delete_rule(rule_id, domain=None):
+    """删除规则；给出 domain 时只删除该领域中的规则。返回删除的行数（0 表示规则不存在）"""
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO rules (conditions, conclusion) VALUES (?, ?)", (conditions, conclusion))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor = conn.cursor()
+        if domain is None:
+            cursor.execute("DELETE FROM rules WHERE id=?", (rule_id,))
+        else:
+            cursor.execute("DELETE FROM rules WHERE id=? AND domain=?", (rule_id, domain))
+        count = cursor.rowcount
+        if count:
+            cursor.execute("DELETE FROM rule_conditions WHERE rule_id=?", (rule_id,))
+    if count:
+        _bump_version()
+    return count
 
-def delete_rule(rule_id):
+
+@profiling.timed_db
+def update_rule(rule_id, conditions, conclusion, domain=None):
+    """修改规则；给出 domain 时只修改该领域中的规则。返回修改的行数（0 表示规则不存在）"""
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM rules WHERE id=?", (rule_id,))
-    conn.commit()
-    conn.close()
+    with conn:
+        cursor = conn.cursor()
+        if domain is None:
+            cursor.execute("UPDATE rules SET conditions=?, conclusion=? WHERE id=?", (conditions, conclusion, rule_id))
+        else:
+            cursor.execute("UPDATE rules SET conditions=?, conclusion=? WHERE id=? AND domain=?",
+                           (conditions, conclusion, rule_id, domain))
+        count = cursor.rowcount
+        if count:
+            _sync_conditions(cursor, rule_id, conditions)
+    if count:
+        _bump_version()
+    return count
+
+
+@profiling.timed_db
+def get_rule(rule_id):
+    """按 ID 读取一条规则 (id, 条件, 结论)，不存在时返回 None"""
+    return get_connection().execute(
+        "SELECT id, conditions, conclusion FROM rules WHERE id = ?", (rule_id,)
+    ).fetchone()
+
+
+@profiling.timed_db
+def page_rules(domain=DEFAULT_DOMAIN, query="", after_id=None, before_id=None, limit=100):
+    """按 ID 的键集分页：返回 (按 ID 升序的一页规则, 该方向上是否还有更多)
+
+    after_id 给出时取 ID 大于它的下一页，before_id 给出时取 ID 小于它的上一页，都不给时取第一页。
+    只按主键范围扫描，与规则总数和页码无关；query 非空时只返回条件或结论中含有各个词的规则，
+    不短于 3 个字的词按子串匹配（trigram 全文索引），更短的词匹配以它开头的特征或结论（unicode61 全文索引的前缀查询）；
+    没有全文索引时退回 LIKE 逐条按子串匹配。
+    """
+    backward = before_id is not None
+    bound = before_id if backward else (after_id if after_id is not None else 0)
+    order = "DESC" if backward else "ASC"
+    terms = query.split()
+    # 各词作为短语加引号，避免用户输入被当作 FTS5 查询语法
+    matches = [
+        ("rules_fts", " ".join(_fts_phrase(t) for t in terms if len(t) >= 3)),
+        ("rules_words", " ".join(_fts_phrase(t) + "*" for t in terms if len(t) < 3)),
+    ]
+    matches = [(name, match) for name, match in matches if match]
+    conn = get_connection()
+    if len(matches) == 2 and _fts_tables() == set(FTS_TABLES):
+        # 长短词混合：两个全文索引各自按 ID 顺序给出结果，归并求交集（让 SQLite 联接两个 FTS5 表时会逐行重算查询）
+        ids = _intersect_sorted([_fts_rowids(name, match, domain, bound, backward) for name, match in matches],
+                                limit + 1, backward)
+        placeholders = ", ".join("?" * len(ids))
+        rows = conn.execute(f"SELECT id, conditions, conclusion FROM rules WHERE id IN ({placeholders}) "
+                            f"ORDER BY id {order}", ids).fetchall()
+    else:
+        sql = ["SELECT r.id, r.conditions, r.conclusion"]
+        params = []
+        if len(matches) == 1 and matches[0][0] in _fts_tables():
+            # rowid 范围与排序由 FTS5 直接完成
+            name, match = matches[0]
+            sql.append(f"FROM {name} JOIN rules r ON r.id = {name}.rowid WHERE {name} MATCH ?")
+            params.append(match)
+            id_column = f"{name}.rowid"
+        else:
+            sql.append("FROM rules r WHERE 1")
+            for t in terms:
+                pattern = "%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                sql.append("AND (r.conditions LIKE ? ESCAPE '\\' OR r.conclusion LIKE ? ESCAPE '\\')")
+                params += [pattern, pattern]
+            id_column = "r.id"
+        sql.append(f"AND r.domain = ? AND {id_column} {'<' if backward else '>'} ?")
+        sql.append(f"ORDER BY {id_column} {order} LIMIT ?")
+        params += [domain, bound, limit + 1]
+        rows = conn.execute(" ".join(sql), params).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+    return rows, more
+
+
+def _fts_rowids(name, match, domain, bound, backward, batch_size=1000):
+    """全文索引 name 中匹配 match、属于领域 domain 的规则 ID，从 bound 起按 ID 顺序（backward 时倒序）逐批读取"""
+    cursor = get_connection().execute(
+        f"SELECT {name}.rowid FROM {name} JOIN rules r ON r.id = {name}.rowid "
+        f"WHERE {name} MATCH ? AND r.domain = ? AND {name}.rowid {'<' if backward else '>'} ? "
+        f"ORDER BY {name}.rowid {'DESC' if backward else 'ASC'}",
+        (match, domain, bound)
+    )
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for rowid, in rows:
+            yield rowid
+
+
+def _intersect_sorted(streams, limit, descending=False):
+    """同方向有序的两个 ID 流的交集，最多取 limit 个"""
+    a, b = streams
+    out = []
+    x, y = next(a, None), next(b, None)
+    while x is not None and y is not None and len(out) < limit:
+        if x == y:
+            out.append(x)
+            x, y = next(a, None), next(b, None)
+        elif (x < y) != descending:
+            x = next(a, None)
+        else:
+            y = next(b, None)
+    return out
 
-def update_rule(rule_id, conditions, conclusion):
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _fts_tables():
+    """已建立的全文索引表名"""
+    placeholders = ", ".join("?" * len(FTS_TABLES))
+    rows = get_connection().execute(f"SELECT name FROM sqlite_master WHERE name IN ({placeholders})", list(FTS_TABLES))
+    return {name for name, in rows}
+
+
+def condition_key(conditions):
+    """规则的条件集合键：与条件顺序、空白和重复无关，用于判断两条规则是否同条件"""
+    return ",".join(sorted(split_conditions(conditions)))
+
+
+@profiling.timed_db
+def iter_rules(batch_size=1000, domain=DEFAULT_DOMAIN):
+    """用游标分批读取一个领域的规则，不会一次把整张表读入内存"""
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT id, conditions, conclusion FROM rules WHERE domain = ? ORDER BY id", (domain,))
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+@profiling.timed_db
+def import_rules(rows, mode="append", dry_run=False, strict=False, batch_size=5000, max_errors=100,
+                 domain=DEFAULT_DOMAIN, cancelled=None):
+    """在一个事务中批量导入规则 [(条件, 结论), ...] 到领域 domain
+
+    mode：append 全部新增；skip 跳过与已有规则（或本批次更早的行）条件集合相同的行；
+          upsert 条件集合相同时更新已有规则的结论。
+    strict 为真时遇到不合法的行整体回滚；dry_run 为真时只统计结果、不写入。
+    rows 中的异常对象表示读取时就已发现格式错误的行，与其它不合法的行一样计数。
+    upsert 时结论没有变化的行不写入，计为跳过。
+    cancelled 为可调用对象时每 batch_size 行检查一次，返回真则回滚并抛出 CancelledError。
+    返回 {"inserted", "updated", "skipped", "invalid", "errors"}。
+    """
+    if mode not in ("append", "skip", "upsert"):
+        raise ValueError(f"未知的导入模式：{mode}")
+    summary = {"inserted": 0, "updated": 0, "skipped": 0, "invalid": 0, "errors": []}
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("UPDATE rules SET conditions=?, conclusion=? WHERE id=?", (conditions, conclusion, rule_id))
-    conn.commit()
-    conn.close()
+    cursor.execute("BEGIN IMMEDIATE")  # 整个导入期间独占写锁，规则 ID 可以预先分配
+    try:
+        existing = {}
+        if mode != "append":
+            for rule_id, conditions, conclusion in iter_rules(domain=domain):
+                existing.setdefault(condition_key(conditions or ""), (rule_id, (conclusion or "").strip()))
+
+        cursor.execute("SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name='rules'), 0),"
+                       " COALESCE((SELECT MAX(id) FROM rules), 0))")
+        next_id = cursor.fetchone()[0] + 1
+        first_id = next_id
+        fts = _fts_tables()
+        if fts:
+            # 只在本事务内可见的标记：新增的规则最后一次性写入全文索引
+            cursor.execute("INSERT OR REPLACE INTO rules_meta (key, value) VALUES ('fts_deferred', 1)")
+
+        inserts, updates = [], []
+        for line_no, row in enumerate(rows, start=1):
+            if cancelled is not None and line_no % batch_size == 0 and cancelled():
+                raise CancelledError("导入已取消")
+            if isinstance(row, Exception):
+                error = str(row)
+            else:
+                conditions, conclusion = row
+                cond_list = split_conditions(conditions or "")
+                conditions = ",".join(cond_list)
+                conclusion = (conclusion or "").strip()
+                error = _validate_rule(cond_list, conclusion)
+            if error:
+                summary["invalid"] += 1
+                if len(summary["errors"]) < max_errors:
+                    summary["errors"].append(f"第 {line_no} 行：{error}")
+                if strict:
+                    raise ValueError(summary["errors"][-1])
+                continue
+
+            key = ",".join(sorted(cond_list)) if mode != "append" else None
+            if key in existing:
+                rule_id, old_conclusion = existing[key]
+                if mode == "skip" or conclusion == old_conclusion:
+                    summary["skipped"] += 1  # 结论没变的 upsert 不写入，也不触发版本号与索引更新
+                else:
+                    updates.append((conditions, conclusion, rule_id))
+                    existing[key] = (rule_id, conclusion)
+                    summary["updated"] += 1
+            else:
+                inserts.append((next_id, conditions, conclusion, domain, cond_list))
+                if mode != "append":
+                    existing[key] = (next_id, conclusion)
+                next_id += 1
+                summary["inserted"] += 1
+
+            if len(inserts) >= batch_size or len(updates) >= batch_size:
+                _flush_import(cursor, inserts, updates)
+        _flush_import(cursor, inserts, updates)
+        for name in fts:
+            cursor.execute(f"INSERT INTO {name} (rowid, conditions, conclusion) "
+                           "SELECT id, conditions, conclusion FROM rules WHERE id >= ?", (first_id,))
+        if fts:
+            cursor.execute("DELETE FROM rules_meta WHERE key = 'fts_deferred'")
+        cursor.execute("INSERT OR IGNORE INTO domains (name, label) VALUES (?, ?)", (domain, domain))
+    except BaseException:
+        conn.rollback()
+        raise
+    if dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+        _bump_version()
+    return summary
+
+
+def _validate_rule(cond_list, conclusion):
+    if not cond_list:
+        return "条件不能为空"
+    if not conclusion:
+        return "结论不能为空"
+    if conclusion in cond_list:
+        return f"结论“{conclusion}”不能同时是自己的条件"
+    return None
+
+
+def _flush_import(cursor, inserts, updates):
+    if inserts:
+        cursor.executemany("INSERT INTO rules (id, conditions, conclusion, domain) VALUES (?, ?, ?, ?)",
+                           [row[:4] for row in inserts])
+        cursor.executemany(
+            "INSERT INTO rule_conditions (rule_id, feature) VALUES (?, ?)",
+            [(row[0], f) for row in inserts for f in row[4]]
+        )
+        inserts.clear()
+    if updates:
+        cursor.executemany("UPDATE rules SET conditions=?, conclusion=? WHERE id=?", updates)
+        # 条件集合相同，条件索引无需改动
+        updates.clear()
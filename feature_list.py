@@ -0,0 +1,163 @@
+# feature_list.py
+import tkinter as tk
+from bisect import bisect_left
+
+
+class FeatureIndex:
+    """特征词表的检索索引：前缀匹配用有序列表二分查找，子串匹配用字符倒排表"""
+
+    def __init__(self, features):
+        self.features = sorted(set(features))
+        self.postings = {}  # 字符 -> 含有该字符的特征下标（递增）
+        for i, f in enumerate(self.features):
+            for ch in set(f):
+                self.postings.setdefault(ch, []).append(i)
+        self._last_query = ""
+        self._last_result = list(range(len(self.features)))
+
+    def search(self, query):
+        """返回匹配的特征下标：前缀匹配的排在前面，其余子串匹配的按字典序在后"""
+        query = query.strip()
+        if not query:
+            return list(range(len(self.features)))
+
+        if self._last_query and query.startswith(self._last_query):
+            # 输入在上一次查询的基础上继续追加字符时，只需在上次结果里再过滤
+            candidates = self._last_result
+        else:
+            lists = [self.postings.get(ch, []) for ch in set(query)]
+            shortest = min(lists, key=len)
+            others = [set(lst) for lst in lists if lst is not shortest]
+            candidates = [i for i in shortest if all(i in s for s in others)]
+
+        matched = [i for i in candidates if query in self.features[i]]
+        self._last_query, self._last_result = query, matched
+
+        lo = bisect_left(self.features, query)
+        prefix = []
+        while lo < len(self.features) and self.features[lo].startswith(query):
+            prefix.append(lo)
+            lo += 1
+        prefix_set = set(prefix)
+        return prefix + [i for i in matched if i not in prefix_set]
+
+
+class VirtualChecklist(tk.Frame):
+    """虚拟化的特征复选列表：只为可见的行创建控件，滚动时复用这些控件
+
+    on_toggle(feature, selected) 在用户勾选 / 取消勾选时调用。
+    """
+
+    ROW_HEIGHT = 24
+
+    def __init__(self, master, features=(), on_toggle=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_toggle = on_toggle
+        self.selected = set()
+        self.index = FeatureIndex(features)
+        self.visible = list(range(len(self.index.features)))  # 当前搜索结果（特征下标）
+        self.offset = 0
+        self.rows = []  # [(Checkbutton, BooleanVar)]
+
+        search_bar = tk.Frame(self)
+        search_bar.pack(fill="x", padx=10, pady=(0, 5))
+        tk.Label(search_bar, text="🔎 搜索：").pack(side="left")
+        self.query = tk.StringVar()
+        self.query.trace_add("write", lambda *_: self._apply_search())
+        tk.Entry(search_bar, textvariable=self.query).pack(side="left", fill="x", expand=True)
+        self.count_label = tk.Label(search_bar, width=10, anchor="e")
+        self.count_label.pack(side="right")
+
+        body = tk.Frame(self)
+        body.pack(fill="both", expand=True)
+        self.scrollbar = tk.Scrollbar(body, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.rows_frame = tk.Frame(body)
+        self.rows_frame.pack(side="left", fill="both", expand=True)
+        self.rows_frame.bind("<Configure>", lambda e: self._resize(e.height))
+        self._bind_wheel(self.rows_frame)
+        self._render()
+
+    def set_features(self, features):
+        """规则变化后原地更新词表；已不存在的特征自动取消勾选"""
+        self.index = FeatureIndex(features)
+        existing = set(self.index.features)
+        for f in sorted(self.selected - existing):
+            self.selected.discard(f)
+            if self.on_toggle:
+                self.on_toggle(f, False)
+        self._apply_search()
+
+    def scroll(self, delta):
+        self._scroll_to(self.offset + delta)
+
+    def _apply_search(self):
+        self.visible = self.index.search(self.query.get())
+        self.offset = 0
+        self._render()
+
+    def _resize(self, height):
+        count = max(1, height // self.ROW_HEIGHT)
+        while len(self.rows) < count:
+            var = tk.BooleanVar()
+            chk = tk.Checkbutton(self.rows_frame, variable=var, anchor="w",
+                                 command=lambda n=len(self.rows): self._on_click(n))
+            chk.place(x=10, y=len(self.rows) * self.ROW_HEIGHT, relwidth=1.0, height=self.ROW_HEIGHT)
+            self._bind_wheel(chk)
+            self.rows.append((chk, var))
+        while len(self.rows) > count:
+            chk, _ = self.rows.pop()
+            chk.destroy()
+        self._scroll_to(self.offset)
+
+    def _scroll_to(self, offset):
+        max_offset = max(0, len(self.visible) - len(self.rows))
+        self.offset = min(max(0, offset), max_offset)
+        self._render()
+
+    def _render(self):
+        features = self.index.features
+        for n, (chk, var) in enumerate(self.rows):
+            pos = self.offset + n
+            if pos < len(self.visible):
+                feature = features[self.visible[pos]]
+                chk.config(text=feature, state="normal")
+                var.set(feature in self.selected)
+            else:
+                chk.config(text="", state="disabled")
+                var.set(False)
+
+        total = len(self.visible)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(self.rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.count_label.config(text=f"{total} 项")
+
+    def _on_click(self, n):
+        pos = self.offset + n
+        if pos >= len(self.visible):
+            return
+        feature = self.index.features[self.visible[pos]]
+        selected = self.rows[n][1].get()
+        if selected:
+            self.selected.add(feature)
+        else:
+            self.selected.discard(feature)
+        if self.on_toggle:
+            self.on_toggle(feature, selected)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(value) * len(self.visible)))
+        elif action == "scroll":
+            step = len(self.rows) if unit == "pages" else 1
+            self.scroll(int(value) * step)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: self.scroll(-3))
+        widget.bind("<Button-5>", lambda e: self.scroll(3))
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
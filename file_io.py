@@ -1,5 +1,136 @@
 # file_io.py
-def write_result_to_file(features, result):
-    with open("result.txt", "a", encoding="utf-8") as f:
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+
+def write_result_to_file(features, result, path="result.txt"):
+    with open(path, "a", encoding="utf-8") as f:
         f.write("输入特征：" + ",".join(features) + "\n")
         f.write("推理结果：" + result + "\n\n")
+
+
+class ResultJournal:
+    """推理结果日志：后台线程批量追加写入 JSONL 文件，超过大小上限时轮转
+
+    每条记录包含时间戳、输入特征、结论、触发的规则和耗时；
+    legacy_path 不为空时同时按旧格式追加到 result.txt。
+    写入失败（磁盘已满、路径不可写等）时报告到标准错误并记在 last_error / failed 中，写入线程继续工作。
+    """
+
+    def __init__(self, path="results.jsonl", max_bytes=10 * 1024 * 1024, backups=5,
+                 batch_size=256, flush_interval=1.0, legacy_path=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.legacy_path = legacy_path
+        self._queue = queue.Queue()
+        self._closed = False
+        self.last_error = None  # 最近一次写入失败的异常
+        self.failed = 0         # 写入失败的批次数
+        self._thread = threading.Thread(target=self._run, name="result-journal", daemon=True)
+        self._thread.start()
+
+    def record(self, features, conclusion, fired_rules=(), latency=None, result=None):
+        """把一条推理结果放入写入队列，立即返回"""
+        if self._closed:
+            raise RuntimeError("日志已关闭")
+        self._check_writer()
+        self._queue.put({
+            "ts": time.time(),
+            "features": list(features),
+            "conclusion": conclusion,
+            "fired_rules": list(fired_rules),
+            "latency_ms": None if latency is None else round(latency * 1000, 3),
+            "result": result,
+        })
+
+    def flush(self):
+        """等待队列中已有的记录全部写入磁盘；写入线程已停止时抛出 RuntimeError，不会一直等待"""
+        done = self._queue.all_tasks_done
+        with done:
+            while self._queue.unfinished_tasks:
+                self._check_writer()
+                done.wait(0.1)
+
+    def _check_writer(self):
+        if not self._thread.is_alive():
+            raise RuntimeError("日志写入线程已停止")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            # 攒一批再写，减少打开文件和刷盘的次数
+            while item is not None and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            records = [r for r in batch if r is not None]
+            try:
+                if records:
+                    self._write(records)
+            except Exception as e:  # 一批写不进去不能让线程退出，否则之后的记录只会堆在队列里
+                self.last_error = e
+                self.failed += 1
+                print(f"⚠ 推理结果日志写入失败（{len(records)} 条）：{e}", file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(records) != len(batch):
+                return
+
+    def _write(self, records):
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(lines) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "ab") as f:
+            f.write(lines)
+        if self.legacy_path:
+            for r in records:
+                write_result_to_file(r["features"], r["result"] or r["conclusion"] or "", self.legacy_path)
+
+    def _rotate(self):
+        """results.jsonl -> results.jsonl.1 -> ... -> results.jsonl.N（最旧的删除）"""
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def read_journal(path="results.jsonl", include_rotated=True):
+    """按时间先后逐条读取日志记录（流式读取，不会一次载入整个文件）"""
+    paths = []
+    if include_rotated:
+        i = 1
+        while os.path.exists(f"{path}.{i}"):
+            paths.append(f"{path}.{i}")
+            i += 1
+        paths.reverse()
+    if os.path.exists(path):
+        paths.append(path)
+    for p in paths:
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
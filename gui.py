@@ -1,11 +1,34 @@
 # gui.py
+import atexit
+import threading
+import time
 import tkinter as tk
-from tkinter import messagebox, StringVar
-from tkinter.ttk import Combobox
-from rules_engine import infer_book
-from file_io import write_result_to_file
-from knowledge_graph import show_knowledge_graph
-from database import get_all_rules, add_rule, delete_rule, update_rule
+from tkinter import filedialog, messagebox, StringVar
+from tkinter.ttk import Combobox, Progressbar
+from rete import ReteNetwork
+from rule_base import CompiledRuleBase, get_rule_base
+from file_io import ResultJournal
+from database import DEFAULT_DOMAIN, get_rule, page_rules, add_rule, delete_rule, update_rule, get_domains
+from worker import TaskRunner
+from feature_list import VirtualChecklist
+from ranking import rank_conclusions
+import analyzer
+import rule_io
+
+# 规则管理窗口每页显示的规则数
+RULES_PAGE_SIZE = 100
+
+
+def _format_rule(row):
+    return f"{row[0]} | {row[1]} -> {row[2]}"
+
+
+def _render_knowledge_graph(token, domain):
+    # networkx / matplotlib 很重，第一次查看图谱时才导入
+    from knowledge_graph import show_knowledge_graph
+    token.report("正在生成知识图谱…")
+    show_knowledge_graph(domain, cancelled=lambda: token.cancelled)
+
 
 class BookFinderGUI:
     def __init__(self, root):
@@ -13,69 +36,184 @@ class BookFinderGUI:
         self.root.title("📖 图书查找系统")
         self.root.geometry("600x800")
 
+        # 规则库领域（图书、动物……），切换后重新加载该领域的规则与特征
+        self.domain = DEFAULT_DOMAIN
+        self.domains = [(DEFAULT_DOMAIN, "图书")]
+        domain_bar = tk.Frame(root)
+        domain_bar.pack(pady=(10, 0))
+        tk.Label(domain_bar, text="领域：").pack(side="left")
+        self.domain_box = Combobox(domain_bar, state="readonly", width=12, values=["图书"])
+        self.domain_box.current(0)
+        self.domain_box.bind("<<ComboboxSelected>>", self._on_domain_selected)
+        self.domain_box.pack(side="left")
+
         # 改为复选框多选模式
-        tk.Label(root, text="请选择图书特征（可多选）", font=("Arial", 12)).pack(pady=10)
-
-        # 从数据库中读取所有规则条件关键词
-        from database import get_all_rules
-        rules = get_all_rules()
-        all_features = set()
-        for r in rules:
-            for cond in r[1].split(','):
-                if cond.strip():
-                    all_features.add(cond.strip())
-
-        # 存储每个复选框对应的变量
-        self.feature_vars = {}
-
-        # 创建一个可以滚动的区域放复选框（防止太多时界面撑开）
-        frame_canvas = tk.Frame(root)
-        frame_canvas.pack(fill="both", expand=True)
-        canvas = tk.Canvas(frame_canvas)
-        scrollbar = tk.Scrollbar(frame_canvas, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas)
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-
-        # 动态生成复选框
-        for feature in sorted(all_features):
-            var = tk.BooleanVar()
-            chk = tk.Checkbutton(scrollable_frame, text=feature, variable=var, anchor="w")
-            chk.pack(fill="x", padx=10)
-            self.feature_vars[feature] = var
+        self.prompt = StringVar(value="请选择图书特征（可多选）")
+        tk.Label(root, textvariable=self.prompt, font=("Arial", 12)).pack(pady=10)
+
+        # 增量推理会话：勾选 / 取消勾选时只更新受影响的规则
+        # 推理在后台线程读取会话，用锁保证与勾选操作互不干扰
+        # 窗口先以空规则库显示，规则由 load_rules 在后台加载
+        self.session = ReteNetwork(CompiledRuleBase([])).new_session()
+        self.session_lock = threading.Lock()
+
+        # 虚拟化的特征列表：只为可见行创建复选框，支持按前缀 / 子串搜索
+        self.checklist = VirtualChecklist(root, on_toggle=self.toggle_feature)
+        self.checklist.pack(fill="both", expand=True)
 
         tk.Button(root, text="🔍 开始推理", command=self.run_inference).pack(pady=5)
-        tk.Button(root, text="📁 查看知识图谱", command=show_knowledge_graph).pack(pady=5)
+        tk.Button(root, text="📁 查看知识图谱", command=self.show_knowledge_graph).pack(pady=5)
         tk.Button(root, text="🧱 管理规则", command=self.manage_rules).pack(pady=5)
 
         self.text = tk.Text(root, height=15)
         self.text.pack(pady=10)
 
-    def run_inference(self):
-        features = [f for f, v in self.feature_vars.items() if v.get()]
-        steps, result = infer_book(features)
+        # ===== 状态栏：后台任务进度与取消 =====
+        status_bar = tk.Frame(root)
+        status_bar.pack(fill="x", side="bottom", padx=10, pady=5)
+        self.status = StringVar(value="就绪")
+        tk.Label(status_bar, textvariable=self.status, anchor="w").pack(side="left", fill="x", expand=True)
+        self.cancel_button = tk.Button(status_bar, text="取消", state="disabled", command=self.cancel_tasks)
+        self.cancel_button.pack(side="right")
+        self.progress = Progressbar(status_bar, mode="indeterminate", length=120)
+        self.progress.pack(side="right", padx=5)
 
+        # 推理、绘图、读取规则都在后台线程执行，界面保持响应
+        self.runner = TaskRunner(root, on_busy=self._on_busy, on_progress=self._on_progress)
+
+        # 推理结果在后台批量写入日志，同时保留 result.txt 旧格式
+        self.journal = ResultJournal(legacy_path="result.txt")
+        atexit.register(self.journal.close)
+
+    def toggle_feature(self, feature, selected):
+        with self.session_lock:
+            self.session.toggle(feature, selected)
+
+    def selected_features(self):
+        return sorted(self.checklist.selected)
+
+    def run_inference(self):
+        self.status.set("正在推理…")
+        self.runner.submit("infer", self._infer_task, self.selected_features(),
+                           on_done=self._show_inference, on_error=self._show_error)
+
+    def _infer_task(self, token, features):
+        start = time.perf_counter()
+        with self.session_lock:
+            proof = self.session.proof()
+            rule_base = self.session.network.rule_base
+        # 没有完全匹配的规则时，按条件重合度给出最接近的结论
+        suggestions = [] if proof else rank_conclusions(features, k=5, threshold=0.2, rule_base=rule_base)
+        latency = time.perf_counter() - start
+        steps, result = proof.render()
+        self.journal.record(features, proof.final, fired_rules=proof.rule_ids(), latency=latency, result=result)
+        return steps, result, suggestions
+
+    def _show_inference(self, outcome):
+        steps, result, suggestions = outcome
         self.text.delete("1.0", tk.END)  # 清空旧内容
         self.text.insert(tk.END, "推理过程如下：\n\n")
         for step in steps:
             self.text.insert(tk.END, f"{step}\n")
         self.text.insert(tk.END, "\n" + result + "\n")
-
-        write_result_to_file(features, result)
+        if suggestions:
+            self.text.insert(tk.END, f"\n最接近的{self._domain_label()}：\n")
+            for s in suggestions:
+                self.text.insert(tk.END, f"{s['conclusion']}（相似度 {s['score']:.2f}，还缺：{'、'.join(s['missing'])}）\n")
+        self.status.set("推理完成")
+
+    def show_knowledge_graph(self):
+        self.status.set("正在生成知识图谱…")
+        self.runner.submit("graph", _render_knowledge_graph, self.domain,
+                           on_done=lambda _: self.status.set("知识图谱已生成"), on_error=self._show_error)
+
+    def load_rules(self, prepare=None, on_loaded=None):
+        """在后台（可先执行 prepare，如初始化数据库）加载规则库，完成后填充特征列表"""
+        self.status.set("正在加载规则…")
+
+        def task(token):
+            if prepare is not None:
+                prepare()
+            return get_domains(), ReteNetwork.from_database(domain).new_session(features)
+
+        def done(outcome):
+            domains, session = outcome
+            self._set_domains(domains)
+            if domain != self.domain:
+                return  # 加载期间用户又切换了领域，以后一次加载为准
+            self._swap_session(session, features)
+            self.status.set("就绪")
+            if on_loaded:
+                on_loaded()
+
+        domain = self.domain
+        features = self.selected_features()
+        self.runner.submit("reload", task, on_done=done, on_error=self._show_error)
+
+    def _domain_label(self):
+        return dict(self.domains).get(self.domain, self.domain)
+
+    def _set_domains(self, domains):
+        self.domains = domains or [(DEFAULT_DOMAIN, "图书")]
+        self.domain_box.config(values=[label for _, label in self.domains])
+        names = [name for name, _ in self.domains]
+        if self.domain in names:
+            self.domain_box.current(names.index(self.domain))
+
+    def _on_domain_selected(self, event=None):
+        domain = self.domains[self.domain_box.current()][0]
+        if domain == self.domain:
+            return
+        # 不同领域的特征互不相干：清空勾选，换成新领域的空会话，再在后台加载规则
+        self.domain = domain
+        self.checklist.selected.clear()
+        with self.session_lock:
+            self.session = ReteNetwork(CompiledRuleBase([], domain=domain, label=self._domain_label())).new_session()
+        self.checklist.set_features([])
+        self.prompt.set(f"请选择{self._domain_label()}特征（可多选）")
+        self.text.delete("1.0", tk.END)
+        self.load_rules()
+
+    def reload_session(self):
+        """规则变化后在后台重建匹配网络，完成后恢复当前勾选的特征"""
+        self.load_rules()
+
+    def _swap_session(self, session, features):
+        # 原地更新特征列表（已删除的特征会被取消勾选）
+        self.checklist.set_features(session.network.rule_base.vocabulary)
+        # 重建期间用户可能又勾选 / 取消了特征，在主线程补上这些变化
+        current = set(self.selected_features())
+        for f in set(features) - current:
+            session.retract_fact(f)
+        for f in current - set(features):
+            session.assert_fact(f)
+        with self.session_lock:
+            self.session = session
+
+    def cancel_tasks(self):
+        self.runner.cancel()
+        self.status.set("已取消")
+
+    def _on_busy(self, running):
+        if running:
+            self.progress.start(10)
+            self.cancel_button.config(state="normal")
+        else:
+            self.progress.stop()
+            self.cancel_button.config(state="disabled")
+
+    def _on_progress(self, key, progress):
+        self.status.set(str(progress))
+
+    def _show_error(self, error):
+        self.status.set("出错")
+        messagebox.showerror("错误", str(error))
 
     def manage_rules(self):
+        domain = self.domain
         win = tk.Toplevel(self.root)
-        win.title("规则管理")
-        win.geometry("640x420")
+        win.title(f"规则管理（{self._domain_label()}）")
+        win.geometry("640x520")
 
         # ===== 输入区 =====
         tk.Label(win, text="条件：").grid(row=0, column=0, sticky="e", padx=5, pady=5)
@@ -86,14 +224,102 @@ class BookFinderGUI:
         concl_entry = tk.Entry(win, width=45, state="readonly")
         concl_entry.grid(row=1, column=1, pady=5)
 
+        def set_entry(entry, text):
+            # 临时解除 readonly，更新后再恢复
+            entry.config(state='normal')
+            entry.delete(0, tk.END)
+            entry.insert(0, text)
+            entry.config(state='readonly')
+
+        def check_then_save(popup, cond, concl, save, rule_id=None):
+            """保存前在后台检查规则（可能需要编译规则库），有问题时让用户确认，确认后再调用 save()"""
+            def task(token):
+                return analyzer.check_rule(cond, concl, get_rule_base(domain), rule_id)
+
+            def done(warnings):
+                if not popup.winfo_exists():
+                    return  # 检查期间窗口已关闭
+                if warnings and not messagebox.askyesno(
+                        "规则检查", "\n".join(warnings) + "\n\n仍然保存吗？", parent=popup):
+                    return
+                save()
 
-        # ===== 操作按钮区 =====
-        def refresh_rules():
-            rules = get_all_rules()
-            listbox.delete(0, tk.END)
-            for i, r in enumerate(rules, start=1):
-                listbox.insert(tk.END, f"{i} | {r[1]} -> {r[2]}")
+            # 每个弹窗一个任务键：连续点击只保存一次，不同弹窗的检查互不合并
+            self.runner.submit(f"check:{popup}", task, on_done=done, on_error=self._show_error)
+
+        # ===== 分页浏览：按规则 ID 的键集分页，只读取当前一页 =====
+        # rows 与列表框逐行对应；first / last 是本页的键集边界（删光本页的行后仍可据此翻页）
+        page = {"rows": [], "has_prev": False, "has_next": False, "first": None, "last": None}
+
+        def show_page(after_id=None, before_id=None):
+            query = search_var.get().strip()
 
+            def task(token):
+                return page_rules(domain, query, after_id, before_id, RULES_PAGE_SIZE)
+
+            def fill(result):
+                if not win.winfo_exists():
+                    return  # 读取期间窗口已关闭
+                rows, more = result
+                if before_id is not None and not rows:
+                    page["has_prev"] = False  # 前面已经没有规则
+                    update_nav()
+                    return
+                page["rows"] = list(rows)
+                if rows:
+                    page["first"], page["last"] = rows[0][0], rows[-1][0]
+                elif after_id is not None:
+                    page["first"], page["last"] = after_id + 1, after_id  # 空页：覆盖 after_id 之后的范围
+                else:
+                    page["first"] = page["last"] = None
+                page["has_prev"] = more if before_id is not None else after_id is not None
+                page["has_next"] = more if before_id is None else True
+                listbox.delete(0, tk.END)
+                for row in rows:
+                    listbox.insert(tk.END, _format_rule(row))
+                update_nav()
+
+            # 每个窗口一个任务键：不同领域的规则管理窗口翻页互不合并
+            self.runner.submit(f"rules:{win}", task, on_done=fill, on_error=self._show_error)
+
+        def update_nav():
+            rows = page["rows"]
+            page_label.config(text=f"ID {rows[0][0]} – {rows[-1][0]}" if rows else "没有规则")
+            prev_button.config(state="normal" if page["has_prev"] else "disabled")
+            next_button.config(state="normal" if page["has_next"] else "disabled")
+
+        def prev_page():
+            if page["first"] is not None:
+                show_page(before_id=page["first"])
+
+        def next_page():
+            if page["last"] is not None:
+                show_page(after_id=page["last"])
+
+        def reload_engine():
+            if domain == self.domain:
+                self.reload_session()
+
+        def selected_index():
+            sel = listbox.curselection()
+            return sel[0] if sel and sel[0] < len(page["rows"]) else None
+
+        def row_index(rule_id):
+            """规则在当前页中的位置（后台写入期间页面可能已经切换），不在本页时返回 None"""
+            return next((i for i, row in enumerate(page["rows"]) if row[0] == rule_id), None)
+
+        def submit_write(key, task, done, button=None):
+            """写数据库放到后台执行（导入持有写锁时可能要等待），期间禁用按钮以免重复提交"""
+            def on_error(error):
+                if button is not None and button.winfo_exists():
+                    button.config(state="normal")
+                self._show_error(error)
+
+            if button is not None:
+                button.config(state="disabled")
+            self.runner.submit(key, lambda token: task(), on_done=done, on_error=on_error)
+
+        # ===== 操作按钮区 =====
         def add():
             popup = tk.Toplevel(win)
             popup.title("➕ 添加新规则")
@@ -113,49 +339,78 @@ class BookFinderGUI:
                 if not cond or not concl:
                     messagebox.showwarning("警告", "条件和结论不能为空")
                     return
-                add_rule(cond, concl)
-                messagebox.showinfo("成功", "规则已添加")
-                popup.destroy()
-                refresh_rules()
-
-            tk.Button(popup, text="确定添加", command=confirm_add).pack(pady=10)
+                check_then_save(popup, cond, concl, lambda: save_new(cond, concl))
+
+            def save_new(cond, concl):
+                def task():
+                    rule_id = add_rule(cond, concl, domain)
+                    return get_rule(rule_id)
+
+                def done(row):
+                    messagebox.showinfo("成功", f"规则已添加（ID {row[0]}）")
+                    if popup.winfo_exists():
+                        popup.destroy()
+                    # 新规则的 ID 最大：正在看最后一页且没有搜索条件时直接追加到列表末尾
+                    if win.winfo_exists() and not page["has_next"] and not search_var.get().strip():
+                        if len(page["rows"]) < RULES_PAGE_SIZE:
+                            page["rows"].append(row)
+                            listbox.insert(tk.END, _format_rule(row))
+                            if page["first"] is None:
+                                page["first"] = row[0]
+                            page["last"] = row[0]
+                        else:
+                            page["has_next"] = True
+                        update_nav()
+                    reload_engine()
+
+                submit_write(f"save:{popup}", task, done, add_button)
+
+            add_button = tk.Button(popup, text="确定添加", command=confirm_add)
+            add_button.pack(pady=10)
 
         def delete():
-            sel = listbox.curselection()
-            if sel:
-                rid = int(listbox.get(sel[0]).split('|')[0])
-                delete_rule(rid)
-                messagebox.showinfo("成功", "规则已删除")
-                refresh_rules()
+            index = selected_index()
+            if index is not None:
+                rid = page["rows"][index][0]
+
+                def done(count):
+                    if not count:
+                        messagebox.showwarning("警告", f"规则 {rid} 已不存在")
+                    else:
+                        messagebox.showinfo("成功", "规则已删除")
+                    # 只删除这一行，不重新读取整页
+                    i = row_index(rid) if win.winfo_exists() else None
+                    if i is not None:
+                        del page["rows"][i]
+                        listbox.delete(i)
+                        set_entry(cond_entry, "")
+                        set_entry(concl_entry, "")
+                        update_nav()
+                        if not page["rows"]:
+                            # 本页已删空：按原来的边界载入相邻的一页
+                            if page["has_next"]:
+                                next_page()
+                            elif page["has_prev"]:
+                                prev_page()
+                    if count:
+                        reload_engine()
+
+                # 每条规则一个任务键：连续删除不同的规则不会互相合并
+                submit_write(f"delete:{rid}", lambda: delete_rule(rid, domain), done)
 
         def on_select(event):
-            sel = listbox.curselection()
-            if sel:
-                rule_text = listbox.get(sel[0])
-                rid, rest = rule_text.split('|', 1)
-                cond, concl = rest.split('->')
-
-                # 临时解除 readonly，更新后再恢复
-                cond_entry.config(state='normal')
-                cond_entry.delete(0, tk.END)
-                cond_entry.insert(0, cond.strip())
-                cond_entry.config(state='readonly')
-
-                concl_entry.config(state='normal')
-                concl_entry.delete(0, tk.END)
-                concl_entry.insert(0, concl.strip())
-                concl_entry.config(state='readonly')
+            index = selected_index()
+            if index is not None:
+                _, cond, concl = page["rows"][index]
+                set_entry(cond_entry, cond)
+                set_entry(concl_entry, concl)
 
         def edit():
-            sel = listbox.curselection()
-            if not sel:
+            index = selected_index()
+            if index is None:
                 messagebox.showwarning("警告", "请先选中要编辑的规则")
                 return
-            rid = int(listbox.get(sel[0]).split('|')[0])
-            rule_text = listbox.get(sel[0])
-            _, rest = rule_text.split('|', 1)
-            old_cond, old_concl = rest.split('->')
-            old_cond, old_concl = old_cond.strip(), old_concl.strip()
+            rid, old_cond, old_concl = page["rows"][index]
 
             popup = tk.Toplevel(win)
             popup.title("💾 修改规则")
@@ -177,35 +432,122 @@ class BookFinderGUI:
                 if not new_cond or not new_concl:
                     messagebox.showwarning("警告", "条件和结论不能为空")
                     return
-                update_rule(rid, new_cond, new_concl)
-                messagebox.showinfo("成功", "规则已更新")
-                popup.destroy()
-                refresh_rules()
-
-            tk.Button(popup, text="确定修改", command=confirm_edit).pack(pady=10)
-
-        # 三个操作按钮一行排列
+                check_then_save(popup, new_cond, new_concl, lambda: save_edit(new_cond, new_concl), rid)
+
+            def save_edit(new_cond, new_concl):
+                def task():
+                    return get_rule(rid) if update_rule(rid, new_cond, new_concl, domain) else None
+
+                def done(row):
+                    if popup.winfo_exists():
+                        popup.destroy()
+                    if row is None:
+                        messagebox.showwarning("警告", f"规则 {rid} 已不存在")
+                        return
+                    messagebox.showinfo("成功", "规则已更新")
+                    # 只替换这一行
+                    i = row_index(rid) if win.winfo_exists() else None
+                    if i is not None:
+                        page["rows"][i] = row
+                        listbox.delete(i)
+                        listbox.insert(i, _format_rule(row))
+                        listbox.selection_set(i)
+                        on_select(None)
+                    reload_engine()
+
+                submit_write(f"save:{popup}", task, done, save_button)
+
+            save_button = tk.Button(popup, text="确定修改", command=confirm_edit)
+            save_button.pack(pady=10)
+
+        rule_file_types = [("规则文件", "*.csv *.json *.jsonl"), ("所有文件", "*.*")]
+
+        def import_rules_file():
+            path = filedialog.askopenfilename(parent=win, title="导入规则", filetypes=rule_file_types)
+            if not path:
+                return
+            mode = "skip" if messagebox.askyesno("导入规则", "是否跳过与已有规则条件相同的行？", parent=win) else "append"
+
+            def done(summary):
+                messagebox.showinfo("导入完成", f"新增 {summary['inserted']} 条，跳过 {summary['skipped']} 条，"
+                                                f"不合法 {summary['invalid']} 条", parent=win)
+                show_page()
+                reload_engine()
+
+            self.status.set("正在导入规则…")
+            self.runner.submit("import", lambda token: rule_io.import_file(path, mode=mode, domain=domain,
+                                                                           cancelled=lambda: token.cancelled),
+                               on_done=done, on_error=self._show_error)
+
+        def export_rules_file():
+            path = filedialog.asksaveasfilename(parent=win, title="导出规则", defaultextension=".csv",
+                                                filetypes=rule_file_types)
+            if not path:
+                return
+            self.status.set("正在导出规则…")
+            self.runner.submit("export", lambda token: rule_io.export_file(path, domain=domain),
+                               on_done=lambda n: self.status.set(f"已导出 {n} 条规则"), on_error=self._show_error)
+
+        def analyze_rules():
+            def done(report):
+                lines = report.lines()
+                if len(lines) > 30:
+                    lines = lines[:30] + [f"……共 {report.issue_count()} 个问题"]
+                messagebox.showinfo("规则库检查", "\n".join(lines), parent=win)
+                self.status.set(f"规则库检查完成：{report.issue_count()} 个问题")
+
+            self.status.set("正在检查规则库…")
+            self.runner.submit("analyze", lambda token: analyzer.analyze(domain=domain), on_done=done, on_error=self._show_error)
+
+        # 操作按钮一行排列
         btn_frame = tk.Frame(win)
         btn_frame.grid(row=2, column=0, columnspan=3, pady=10)
         tk.Button(btn_frame, text="➕ 新增规则", width=12, command=add).pack(side="left", padx=5)
         tk.Button(btn_frame, text="💾 保存修改", width=12, command=edit).pack(side="left", padx=5)
         tk.Button(btn_frame, text="🗑 删除选中", width=12, command=delete).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="📥 导入", width=8, command=import_rules_file).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="📤 导出", width=8, command=export_rules_file).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="🔍 检查", width=8, command=analyze_rules).pack(side="left", padx=5)
+
+        # ===== 搜索：按条件 / 结论全文检索，输入停顿后回到第一页 =====
+        search_frame = tk.Frame(win)
+        search_frame.grid(row=3, column=0, columnspan=3, sticky="we", padx=10)
+        tk.Label(search_frame, text="🔎 搜索：").pack(side="left")
+        search_var = StringVar()
+        tk.Entry(search_frame, textvariable=search_var).pack(side="left", fill="x", expand=True)
+        search_job = [None]
+
+        def on_search(*_):
+            if search_job[0] is not None:
+                win.after_cancel(search_job[0])
+            search_job[0] = win.after(250, show_page)
+
+        search_var.trace_add("write", on_search)
 
         # ===== 规则列表区 =====
         listbox = tk.Listbox(win, width=85, height=12)
-        listbox.grid(row=3, column=0, columnspan=3, pady=10, padx=10)
+        listbox.grid(row=4, column=0, columnspan=3, pady=10, padx=10)
         listbox.bind('<<ListboxSelect>>', on_select)
 
+        nav_frame = tk.Frame(win)
+        nav_frame.grid(row=5, column=0, columnspan=3)
+        prev_button = tk.Button(nav_frame, text="◀ 上一页", width=10, state="disabled", command=prev_page)
+        prev_button.pack(side="left", padx=5)
+        page_label = tk.Label(nav_frame, width=24)
+        page_label.pack(side="left")
+        next_button = tk.Button(nav_frame, text="下一页 ▶", width=10, state="disabled", command=next_page)
+        next_button.pack(side="left", padx=5)
+
         def clear_selection(event):
             # 获取点击坐标对应的索引
             index = listbox.nearest(event.y)
             bbox = listbox.bbox(index)
             if not bbox or event.y > bbox[1] + bbox[3]:  # 若点击在空白处
                 listbox.selection_clear(0, tk.END)
-                cond_entry.delete(0, tk.END)
-                concl_entry.delete(0, tk.END)
+                set_entry(cond_entry, "")
+                set_entry(concl_entry, "")
 
         # 绑定鼠标点击事件
         listbox.bind("<Button-1>", clear_selection, add="+")
 
-        refresh_rules()
+        show_page()
@@ -1,39 +1,126 @@
 # knowledge_graph.py
+import hashlib
+import json
 import os
+from collections import Counter
 import networkx as nx
+import matplotlib
+matplotlib.use("Agg")  # 只保存图片不弹窗，可以在 GUI 的后台线程中绘图
 import matplotlib.pyplot as plt
-from database import get_all_rules
+from database import DEFAULT_DOMAIN
+from rule_base import get_rule_base
 
 # ✅ 设置中文和负号
 plt.rcParams['font.sans-serif'] = ['SimHei']
-checkFlag = False
 plt.rcParams['axes.unicode_minus'] = False
 
+OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "book_knowledge_graph.png")
+# 与图片一起保存：规则集哈希 + 节点坐标 + 每个节点的邻居，用于跳过重绘和增量布局
+LAYOUT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "book_knowledge_graph.json")
 
-def show_knowledge_graph():
-    if check():
-        show_graph()
+
+def _domain_path(path, domain):
+    """其它领域的图谱文件与图书领域并列存放，如 book_knowledge_graph.animal.png"""
+    if domain == DEFAULT_DOMAIN:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}.{domain}{ext}"
+
+
+def show_knowledge_graph(domain=DEFAULT_DOMAIN, cancelled=None):
+    if check(domain):
+        show_graph(domain, cancelled)
     else:
         print("Already existed.")
 
-def show_graph():
-    rules = get_all_rules()
 
-    # 创建有向图
+def build_graph(rules):
     G = nx.DiGraph()
-    for _, cond, concl in rules:
-        for c in cond.split(','):
-            c = c.strip()
-            if c:
-                G.add_edge(c, concl.strip())
+    for _, cond_list, concl in rules:
+        for c in cond_list:
+            G.add_edge(c, concl)
+    return G
+
+
+def rules_digest(G):
+    """图内容的哈希：只取决于边集合，与规则顺序和 ID 无关"""
+    h = hashlib.sha256()
+    for u, v in sorted(G.edges):
+        h.update(f"{u}\x1f{v}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _load_layout_cache(domain=DEFAULT_DOMAIN):
+    try:
+        with open(_domain_path(LAYOUT_CACHE_PATH, domain), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_layout_cache(digest, G, pos, domain=DEFAULT_DOMAIN):
+    cache = {
+        "digest": digest,
+        "positions": {n: [float(x), float(y)] for n, (x, y) in pos.items()},
+        "neighbors": _neighbor_signature(G),
+    }
+    with open(_domain_path(LAYOUT_CACHE_PATH, domain), "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+
+
+def _neighbor_signature(G):
+    return {n: sorted(set(G.predecessors(n)) | set(G.successors(n))) for n in G.nodes}
+
+
+def incremental_layout(G, cache):
+    """以上次的坐标为初值，只给新增或邻居发生变化的节点重新布局"""
+    old_pos = cache.get("positions", {})
+    old_neighbors = cache.get("neighbors", {})
+    signature = _neighbor_signature(G)
+    stable = [n for n in G.nodes if n in old_pos and old_neighbors.get(n) == signature[n]]
+
+    if not stable:
+        # ✅ 使用 spring_layout 自动布局，防止节点重叠
+        # k 值越大，节点间距离越远；iterations 越多布局越均匀
+        return nx.spring_layout(G, k=1.5, iterations=100, seed=42)
+    if len(stable) == len(G.nodes):
+        return {n: tuple(old_pos[n]) for n in G.nodes}
+
+    # 新节点放在已布局邻居的重心附近，其余节点沿用旧坐标
+    seed = {n: tuple(old_pos[n]) for n in G.nodes if n in old_pos}
+    for n in G.nodes:
+        if n not in seed:
+            placed = [seed[m] for m in signature[n] if m in seed]
+            if placed:
+                seed[n] = (sum(p[0] for p in placed) / len(placed) + 0.05,
+                           sum(p[1] for p in placed) / len(placed) + 0.05)
+    return nx.spring_layout(G, k=1.5, pos=seed or None, fixed=stable, iterations=50, seed=42)
+
+
+def show_graph(domain=DEFAULT_DOMAIN, cancelled=None):
+    """生成图谱图片；cancelled() 为真时在布局前后放弃生成（布局和绘图本身无法中途打断）"""
+    rule_base = get_rule_base(domain)
+    rules = rule_base.rules
+    output_path = _domain_path(OUTPUT_PATH, domain)
+
+    # 创建有向图
+    G = build_graph(rules)
 
     if len(G.nodes) == 0:
         print("❌ 当前数据库中没有规则，无法生成知识图谱")
         return
 
-    # ✅ 使用 spring_layout 自动布局，防止节点重叠
-    pos = nx.spring_layout(G, k=1.5, iterations=100, seed=42)
-    # k 值越大，节点间距离越远；iterations 越多布局越均匀
+    digest = rules_digest(G)
+    cache = _load_layout_cache(domain)
+    if cache.get("digest") == digest and os.path.exists(output_path):
+        print(f"✅ 规则未变化，沿用已有知识图谱: {output_path}")
+        return output_path
+
+    if cancelled is not None and cancelled():
+        return None
+    pos = incremental_layout(G, cache)
+    if cancelled is not None and cancelled():
+        return None
 
     plt.figure(figsize=(10, 8))
 
@@ -67,16 +154,190 @@ def show_graph():
         verticalalignment='center'
     )
 
-    plt.title("📚 图书知识图谱", fontsize=14, fontweight='bold')
+    plt.title(f"📚 {rule_base.label}知识图谱", fontsize=14, fontweight='bold')
     plt.axis('off')
 
     # ✅ 保存图片到项目目录下
-    output_path = os.path.join(os.path.dirname(__file__), "book_knowledge_graph.png")
     plt.tight_layout()
     plt.savefig(output_path, dpi=200, bbox_inches='tight')
+    plt.close()
+    _save_layout_cache(digest, G, pos, domain)
     print(f"✅ 知识图谱已保存到: {output_path}")
+    return output_path
+
+
+def check(domain=DEFAULT_DOMAIN):
+    """是否需要重新生成图谱：图片不存在，或规则集自上次生成后发生了变化"""
+    if not os.path.exists(_domain_path(OUTPUT_PATH, domain)):
+        return True
+    cache = _load_layout_cache(domain)
+    return cache.get("digest") != rules_digest(build_graph(get_rule_base(domain).rules))
+
+# ===== 大规模规则库的视图与导出 =====
+
+def neighborhood_graph(G, center, hops=2):
+    """以某个结论或特征为中心，取 hops 跳以内的子图（不区分边方向）"""
+    if center not in G:
+        raise KeyError(f"图中没有节点：{center}")
+    return nx.ego_graph(G, center, radius=hops, undirected=True)
+
+
+def aggregate_graph(G, max_degree=30):
+    """把连到过多结论的特征节点折叠成一个汇总节点，避免图被少数高频特征淹没"""
+    H = nx.DiGraph()
+    H.add_nodes_from(G.nodes(data=True))
+    for n in G.nodes:
+        succ = list(G.successors(n))
+        if G.in_degree(n) == 0 and len(succ) > max_degree:
+            summary = f"{n} → {len(succ)} 个结论"
+            H.add_node(summary, count=len(succ))
+            H.add_edge(n, summary)
+        else:
+            H.add_edges_from((n, m) for m in succ)
+    H.remove_nodes_from([n for n in list(H.nodes) if H.degree(n) == 0])
+    return H
 
-    # plt.show()
 
-def check():
-    return checkFlag
\ No newline at end of file
+def layered_layout(G):
+    """分层布局，耗时与节点数、边数成线性：特征在最左层，结论按推理深度向右排列"""
+    layer = {}
+    frontier = [n for n in G.nodes if G.in_degree(n) == 0]
+    for n in frontier:
+        layer[n] = 0
+    while frontier:
+        nxt = []
+        for n in frontier:
+            for m in G.successors(n):
+                if m not in layer:
+                    layer[m] = layer[n] + 1
+                    nxt.append(m)
+        frontier = nxt
+    for n in G.nodes:
+        layer.setdefault(n, 0)  # 只在环里出现的节点
+
+    columns = {}
+    for n in G.nodes:
+        columns.setdefault(layer[n], []).append(n)
+    pos = {}
+    for x, nodes in columns.items():
+        step = 1.0 / max(len(nodes) - 1, 1)
+        for i, n in enumerate(nodes):
+            pos[n] = (float(x), 1.0 - 2 * i * step if len(nodes) > 1 else 0.0)
+    return pos
+
+
+def show_view(center=None, hops=2, aggregate=False, max_degree=30, output_path=None, domain=DEFAULT_DOMAIN):
+    """渲染领域 domain 的邻域 / 聚合视图，使用线性复杂度的分层布局；节点很多时自动缩小节点、隐藏标签"""
+    rule_base = get_rule_base(domain)
+    G = build_graph(rule_base.rules)
+    if center is not None:
+        G = neighborhood_graph(G, center, hops)
+    if aggregate:
+        G = aggregate_graph(G, max_degree)
+    if len(G.nodes) == 0:
+        print("❌ 当前视图中没有节点")
+        return
+
+    pos = layered_layout(G)
+    n = len(G.nodes)
+    node_size = max(20, min(2600, 200000 // n))
+    plt.figure(figsize=(12, 9))
+    nx.draw_networkx_nodes(G, pos, node_color='skyblue', node_size=node_size, edgecolors='black', linewidths=0.5)
+    nx.draw_networkx_edges(G, pos, arrows=n <= 500, edge_color='gray', width=0.6)
+    if n <= 300:
+        nx.draw_networkx_labels(G, pos, font_size=9)
+    plt.title(f"📚 {rule_base.label}知识图谱（{center or '全部'}，{n} 个节点）", fontsize=14, fontweight='bold')
+    plt.axis('off')
+
+    output_path = output_path or _domain_path(os.path.join(os.path.dirname(__file__), "book_knowledge_graph_view.png"),
+                                              domain)
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=200, bbox_inches='tight')
+    plt.close()
+    print(f"✅ 知识图谱视图已保存到: {output_path}")
+    return output_path
+
+
+def export_graph(G, path, fmt=None):
+    """把图逐行流式写出为 GraphML / DOT / SVG，不经过栅格化，便于在外部工具中查看"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    writers = {"graphml": _graphml_lines, "dot": _dot_lines, "gv": _dot_lines, "svg": _svg_lines}
+    if fmt not in writers:
+        raise ValueError(f"不支持的导出格式：{fmt}")
+    with open(path, "w", encoding="utf-8") as f:
+        for line in writers[fmt](G):
+            f.write(line + "\n")
+    return path
+
+
+def _graphml_lines(G):
+    return nx.generate_graphml(G)
+
+
+def _dot_quote(s):
+    return '"' + str(s).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _dot_lines(G):
+    yield "digraph knowledge_graph {"
+    yield "  rankdir=LR;"
+    yield "  node [shape=ellipse, style=filled, fillcolor=skyblue];"
+    for n in G.nodes:
+        yield f"  {_dot_quote(n)};"
+    for u, v in G.edges:
+        yield f"  {_dot_quote(u)} -> {_dot_quote(v)};"
+    yield "}"
+
+
+def _svg_lines(G):
+    from xml.sax.saxutils import escape
+    pos = layered_layout(G)
+    layers = max((x for x, _ in pos.values()), default=0) + 1
+    rows = max(Counter(x for x, _ in pos.values()).values(), default=1)  # 节点最多的一层
+    width, height = 220 * layers + 40, max(18 * rows + 40, 200)
+
+    def xy(n):
+        x, y = pos[n]
+        return 20 + 220 * x + 60, 20 + (1 - y) / 2 * (height - 40)
+
+    yield '<?xml version="1.0" encoding="UTF-8"?>'
+    yield f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" font-size="11">'
+    yield '<g stroke="gray" stroke-width="0.6">'
+    for u, v in G.edges:
+        (x1, y1), (x2, y2) = xy(u), xy(v)
+        yield f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}"/>'
+    yield '</g>'
+    yield '<g fill="skyblue" stroke="black" stroke-width="0.5">'
+    for n in G.nodes:
+        x, y = xy(n)
+        yield f'<circle cx="{x:.1f}" cy="{y:.1f}" r="5"><title>{escape(str(n))}</title></circle>'
+    yield '</g>'
+    yield '<g fill="black">'
+    for n in G.nodes:
+        x, y = xy(n)
+        yield f'<text x="{x + 8:.1f}" y="{y + 4:.1f}">{escape(str(n))}</text>'
+    yield '</g>'
+    yield '</svg>'
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="生成或导出知识图谱视图")
+    parser.add_argument("--center", help="以该结论或特征为中心取邻域子图")
+    parser.add_argument("--hops", type=int, default=2, help="邻域跳数（默认 2）")
+    parser.add_argument("--aggregate", action="store_true", help="折叠高连接度的特征节点")
+    parser.add_argument("--max-degree", type=int, default=30, help="折叠阈值（默认 30）")
+    parser.add_argument("--export", help="导出到文件（.graphml / .dot / .svg），不渲染图片")
+    parser.add_argument("--domain", default=DEFAULT_DOMAIN, help="规则库领域（默认 book）")
+    args = parser.parse_args()
+
+    if args.export:
+        graph = build_graph(get_rule_base(args.domain).rules)
+        if args.center:
+            graph = neighborhood_graph(graph, args.center, args.hops)
+        if args.aggregate:
+            graph = aggregate_graph(graph, args.max_degree)
+        print(f"✅ 已导出到: {export_graph(graph, args.export)}")
+    else:
+        show_view(args.center, args.hops, args.aggregate, args.max_degree, domain=args.domain)
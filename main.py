@@ -1,11 +1,42 @@
 # main.py
-from database import init_db
-from gui import BookFinderGUI
+from startup import StartupTimer
+
+timer = StartupTimer()
+
+import argparse
 import tkinter as tk
 
 
-if __name__ == "__main__":
-    init_db()  # 初始化数据库
+def main():
+    parser = argparse.ArgumentParser(description="图书推理与知识图谱系统")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="规则加载完成后打印启动耗时报告并退出（用于跟踪冷启动时间）")
+    parser.add_argument("--report-json", help="同时把启动耗时报告写成 JSON 文件")
+    args = parser.parse_args()
+
+    from database import init_db
+    from gui import BookFinderGUI
+    timer.mark("import gui")
+
     root = tk.Tk()
     app = BookFinderGUI(root)
+    timer.mark("window built")
+    root.after_idle(lambda: timer.mark("first idle"))
+
+    def loaded():
+        timer.mark("rules loaded")
+        if args.startup_report:
+            from startup import import_times, print_report, write_report
+            report = timer.report(import_times("gui"))
+            print_report(report)
+            if args.report_json:
+                write_report(report, args.report_json)
+            root.after(0, root.destroy)
+
+    # 先显示窗口，初始化数据库（示例规则检查）与加载规则放到后台执行
+    app.load_rules(prepare=init_db, on_loaded=loaded)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# profiling.py
+import functools
+import json
+import sqlite3
+import threading
+import time
+
+# 关闭时推理和数据库调用只多一次全局变量判断
+enabled = False
+
+_hooks = []
+_lock = threading.Lock()
+
+
+class Stats:
+    """推理与数据库调用的累计统计"""
+
+    def __init__(self):
+        self.queries = 0
+        self.cache_hits = 0
+        self.phases = {"load": 0.0, "match": 0.0, "select": 0.0}
+        self.passes = 0
+        self.max_passes = 0
+        self.rules = {}  # rule_id -> [评估次数, 触发次数]
+        self.db = {}     # 函数名 -> [调用次数, 总耗时]
+
+
+STATS = Stats()
+
+
+def enable(flag=True):
+    global enabled
+    enabled = flag
+
+
+def reset():
+    global STATS
+    with _lock:
+        STATS = Stats()
+
+
+def register_hook(hook):
+    """注册自定义分析钩子 hook(event, data)；event 为 "query" 或 "db" """
+    _hooks.append(hook)
+    return hook
+
+
+def unregister_hook(hook):
+    _hooks.remove(hook)
+
+
+def _emit(event, data):
+    for hook in list(_hooks):
+        hook(event, data)
+
+
+def record_query(timings, passes, rule_counts, cache_hit=False):
+    """记录一次推理：各阶段耗时（秒）、饱和轮数、每条规则的 [评估, 触发] 次数"""
+    with _lock:
+        STATS.queries += 1
+        if cache_hit:
+            STATS.cache_hits += 1
+        for phase, seconds in timings.items():
+            STATS.phases[phase] = STATS.phases.get(phase, 0.0) + seconds
+        STATS.passes += passes
+        STATS.max_passes = max(STATS.max_passes, passes)
+        for rule_id, (evals, fires) in rule_counts.items():
+            counts = STATS.rules.setdefault(rule_id, [0, 0])
+            counts[0] += evals
+            counts[1] += fires
+    if _hooks:
+        _emit("query", {"timings": timings, "passes": passes, "rules": rule_counts, "cache_hit": cache_hit})
+
+
+def timed_db(fn):
+    """数据库函数的计时装饰器"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with _lock:
+                counts = STATS.db.setdefault(fn.__name__, [0, 0.0])
+                counts[0] += 1
+                counts[1] += elapsed
+            if _hooks:
+                _emit("db", {"name": fn.__name__, "seconds": elapsed})
+    return wrapper
+
+
+def snapshot(rule_ids=None):
+    """返回当前统计的快照；给出 rule_ids 时同时列出从未触发过的规则"""
+    with _lock:
+        data = {
+            "timestamp": time.time(),
+            "queries": STATS.queries,
+            "cache_hits": STATS.cache_hits,
+            "phases_ms": {k: round(v * 1000, 3) for k, v in STATS.phases.items()},
+            "avg_passes": STATS.passes / (STATS.queries - STATS.cache_hits) if STATS.queries > STATS.cache_hits else 0.0,
+            "max_passes": STATS.max_passes,
+            "rules": {str(rid): {"evaluations": e, "firings": f} for rid, (e, f) in STATS.rules.items()},
+            "db": {name: {"calls": n, "total_ms": round(t * 1000, 3)} for name, (n, t) in STATS.db.items()},
+        }
+        if rule_ids is not None:
+            data["never_fired"] = [rid for rid in rule_ids if STATS.rules.get(rid, (0, 0))[1] == 0]
+    return data
+
+
+def export_json(path, rule_ids=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(rule_ids), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def export_sqlite(path="stats.db", rule_ids=None):
+    """把快照写入单独的统计数据库（不写 system.db，避免规则库版本号被误判为已变化）"""
+    data = snapshot(rule_ids)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rule_stats (
+                snapshot_ts REAL, rule_id INTEGER, evaluations INTEGER, firings INTEGER
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS query_stats (
+                snapshot_ts REAL, queries INTEGER, cache_hits INTEGER, load_ms REAL, match_ms REAL,
+                select_ms REAL, avg_passes REAL, max_passes INTEGER
+            )
+        ''')
+        ts = data["timestamp"]
+        conn.executemany(
+            "INSERT INTO rule_stats VALUES (?, ?, ?, ?)",
+            [(ts, int(rid), r["evaluations"], r["firings"]) for rid, r in data["rules"].items()]
+        )
+        phases = data["phases_ms"]
+        conn.execute(
+            "INSERT INTO query_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (ts, data["queries"], data["cache_hits"], phases.get("load"), phases.get("match"),
+             phases.get("select"), data["avg_passes"], data["max_passes"])
+        )
+    conn.close()
+    return path
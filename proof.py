@@ -0,0 +1,112 @@
+# proof.py
+
+
+class RuleRefs:
+    """按下标延迟取规则的只读序列：批量推理只有在真正需要时才取出（解码）规则"""
+
+    __slots__ = ("_rules", "_indices")
+
+    def __init__(self, rules, indices):
+        self._rules = rules
+        self._indices = indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, i):
+        return self._rules[self._indices[i]]
+
+    def __iter__(self):
+        rules = self._rules
+        return (rules[idx] for idx in self._indices)
+
+
+class ProofGraph:
+    """一次前向推理的证明：按触发顺序记录规则，每条规则由它的条件事实推出结论
+
+    规则为 (rule_id, 条件元组, 结论)，条件事实要么是输入特征，要么是更早触发的规则的结论，
+    因此这些规则构成一个有向无环图。推理过程的文字只在调用 steps() / render() 时才生成。
+
+    最终结论只由推出的事实集合决定（与引擎、触发顺序、事实的添加顺序无关）：
+    1. 只考虑推导出的事实，不考虑输入特征；
+    2. 优先选“终点”结论，即不是任何规则条件的结论（如书名，而不是中间的分类）；
+    3. 仍有多个时，选“能推出它且条件全部成立的规则”中 ID 最小的那个——
+       不用实际触发的那条规则，因为同一事实由哪条规则先推出取决于引擎的求值顺序。
+
+    rule_base 需提供 rules、by_feature（支持 in）、by_conclusion（支持 get）与 label，
+    规则下标按规则 ID 递增。
+    """
+
+    __slots__ = ("features", "fired", "label", "_rule_base", "_final", "_text")
+
+    def __init__(self, features, fired, rule_base):
+        self.features = tuple(features)
+        self.fired = fired                 # 按触发顺序的规则
+        self.label = rule_base.label       # 规则库领域的显示名，如“图书”“动物”
+        self._rule_base = rule_base
+        self._final = False
+        self._text = None
+
+    def __bool__(self):
+        return len(self.fired) > 0
+
+    def rule_ids(self):
+        """按触发顺序返回规则 ID"""
+        return [rule[0] for rule in self.fired]
+
+    def conclusions(self):
+        """按推导顺序返回推出的事实"""
+        return [rule[2] for rule in self.fired]
+
+    def edges(self):
+        """证明图的边 (条件事实, rule_id, 结论)"""
+        for rule_id, cond_list, concl in self.fired:
+            for c in cond_list:
+                yield c, rule_id, concl
+
+    @property
+    def final(self):
+        """最终结论；没有推出任何事实时为 None"""
+        if self._final is False:
+            rule_base = self._rule_base
+            facts = set(self.features)
+            facts.update(rule[2] for rule in self.fired)
+            best = None
+            for _, _, concl in self.fired:
+                key = (concl in rule_base.by_feature, self._first_rule_id(concl, facts))
+                if best is None or key < best[0]:
+                    best = (key, concl)
+            self._final = best[1] if best else None
+        return self._final
+
+    def _first_rule_id(self, concl, facts):
+        """能推出 concl 且条件都在 facts 中的规则的最小 ID（实际触发的规则一定满足，循环总会返回）"""
+        rules = self._rule_base.rules
+        for idx in self._rule_base.by_conclusion.get(concl, ()):
+            rule_id, cond_list, _ = rules[idx]
+            if all(c in facts for c in cond_list):
+                return rule_id
+
+    def steps(self):
+        """推理过程的文字（含最终结论一行）"""
+        return list(self.render()[0])
+
+    def result(self):
+        return self.render()[1]
+
+    def render(self):
+        """返回与 infer_book 相同形式的 (推理过程, 结果)；文字只生成一次"""
+        if self._text is None:
+            steps = [f"{'、'.join(cond_list)} → {concl}" for _, cond_list, concl in self.fired]
+            final = self.final
+            if final is None:
+                self._text = (tuple(steps), "❌ 无法根据当前条件得出结论")
+            else:
+                steps.append(f"✅ 最终结论：{final}")
+                self._text = (tuple(steps), f"所识别的{self.label}为：{final}")
+        steps, result = self._text
+        return list(steps), result
+
+    def to_dict(self):
+        """不含文字的紧凑表示，供批量输出与服务接口使用"""
+        return {"conclusion": self.final, "rules": self.rule_ids(), "facts": self.conclusions()}
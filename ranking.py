@@ -0,0 +1,89 @@
+# ranking.py
+import heapq
+import math
+from collections import Counter
+from database import DEFAULT_DOMAIN
+from rule_base import get_rule_base
+
+METRICS = ("jaccard", "coverage")
+
+
+def _rule_lengths(rule_base):
+    return [len(cond_list) for _, cond_list, _ in rule_base.rules]
+
+
+def _min_overlap(metric, threshold, query_size):
+    """达到阈值至少需要命中的条件数
+
+    jaccard = 命中数 / (规则条件数 + 输入特征数 - 命中数)，最多为 命中数 / 输入特征数；
+    coverage = 命中数 / 规则条件数，至少命中一个条件才有分。
+    """
+    if metric == "jaccard" and threshold > 0:
+        return max(1, math.ceil(threshold * query_size - 1e-9))
+    return 1
+
+
+def rank_conclusions(features, k=5, metric="jaccard", threshold=0.0, rule_base=None, domain=DEFAULT_DOMAIN):
+    """按条件部分重合程度给结论打分，返回得分最高的 k 个结论
+
+    只有与输入特征至少共享一个条件的规则才会被打分（借助按特征的倒排索引）。
+    给出 threshold 时先按所需最少命中数做前缀过滤：特征按倒排表长度从短到长排列，
+    只从最短的若干张倒排表里取候选规则，很常见的特征不再逐条扫描。
+    每个结论取其得分最高的规则，返回
+    [{"conclusion", "score", "rule_id", "matched", "missing"}, ...]，按得分从高到低排列。
+    不给 rule_base 时使用领域 domain 的当前规则库。
+    """
+    if metric not in METRICS:
+        raise ValueError(f"未知的评分方式：{metric}（可用 {', '.join(METRICS)}）")
+    rule_base = rule_base or get_rule_base(domain)
+    facts = set(features)
+    if not facts or k <= 0:
+        return []
+    by_feature = rule_base.by_feature
+    indexed = sorted((f for f in facts if f in by_feature), key=lambda f: len(by_feature[f]))
+    query_size = len(facts)
+    need = _min_overlap(metric, threshold, query_size)
+    prefix_len = len(indexed) - need + 1
+    if prefix_len <= 0:
+        return []
+
+    # 候选规则：出现在前缀倒排表中的规则；前缀覆盖全部特征时计数就是命中数
+    counts = Counter()
+    for f in indexed[:prefix_len]:
+        counts.update(by_feature[f])
+    exact = prefix_len == len(indexed)
+
+    rules = rule_base.rules
+    lengths = rule_base.cached("rule_lengths", _rule_lengths)
+    best = {}  # 结论 -> (得分, 命中数, -rule_id, 规则下标)
+    for idx, overlap in counts.items():
+        size = lengths[idx]
+        if metric == "jaccard" and min(size, query_size) < threshold * max(size, query_size):
+            continue  # 条件数与输入相差太大，不可能达到阈值
+        rule_id, cond_list, concl = rules[idx]
+        if concl in facts:
+            continue
+        if not exact:
+            overlap = sum(1 for c in cond_list if c in facts)
+        if metric == "jaccard":
+            score = overlap / (size + query_size - overlap)
+        else:
+            score = overlap / size
+        if score < threshold:
+            continue
+        entry = (score, overlap, -rule_id, idx)
+        current = best.get(concl)
+        if current is None or entry > current:
+            best[concl] = entry
+
+    ranked = []
+    for score, _, _, idx in heapq.nlargest(k, best.values()):
+        rule_id, cond_list, concl = rules[idx]
+        ranked.append({
+            "conclusion": concl,
+            "score": round(score, 4),
+            "rule_id": rule_id,
+            "matched": [c for c in cond_list if c in facts],
+            "missing": [c for c in cond_list if c not in facts],
+        })
+    return ranked
@@ -0,0 +1,117 @@
+# rete.py
+from collections import deque
+from database import DEFAULT_DOMAIN
+from proof import ProofGraph
+from rule_base import get_rule_base
+
+
+class ReteNetwork:
+    """由规则库构建的增量匹配网络（TREAT 风格：按特征索引规则，用计数代替逐条扫描）"""
+
+    def __init__(self, rule_base):
+        self.rule_base = rule_base
+        self.rules = rule_base.rules            # [(rule_id, 条件元组, 结论)]
+        self.alpha = rule_base.by_feature       # 事实 -> 含有该条件的规则下标
+        self.producers = rule_base.by_conclusion  # 结论 -> 能推出它的规则下标
+
+    @classmethod
+    def from_database(cls, domain=DEFAULT_DOMAIN):
+        """返回领域当前规则库对应的匹配网络（同一版本的规则库只构建一次）"""
+        return get_rule_base(domain).cached("rete", cls)
+
+    def new_session(self, features=()):
+        session = InferenceSession(self)
+        for f in features:
+            session.assert_fact(f)
+        return session
+
+
+class InferenceSession:
+    """有状态的推理会话：逐个添加 / 撤销事实，只触及受影响的规则"""
+
+    def __init__(self, network):
+        self.network = network
+        self.asserted = set()
+        self.facts = {}  # 事实 -> 推出它的规则下标（用户输入的事实为 None），按推导顺序保存
+        self.counts = [0] * len(network.rules)
+
+    def assert_fact(self, fact):
+        """添加一个事实，返回因此新推出的结论"""
+        if fact in self.asserted:
+            return []
+        self.asserted.add(fact)
+        if fact in self.facts:
+            # 原本是推导出的事实，现在由用户直接给出
+            self.facts[fact] = None
+            return []
+        self.facts[fact] = None
+        agenda = deque()
+        self._activate(fact, agenda)
+        return self._run(agenda)
+
+    def retract_fact(self, fact):
+        """撤销一个用户事实，返回因此失效的结论（不含被撤销的事实本身）"""
+        if fact not in self.asserted:
+            return []
+        self.asserted.discard(fact)
+        rules = self.network.rules
+
+        # 先删除：沿推导依据向下级联删除失去支撑的结论
+        removed = []
+        pending = deque([fact])
+        del self.facts[fact]
+        while pending:
+            g = pending.popleft()
+            removed.append(g)
+            for idx in self.network.alpha.get(g, ()):
+                was_full = self.counts[idx] == len(rules[idx][1])
+                self.counts[idx] -= 1
+                concl = rules[idx][2]
+                if was_full and self.facts.get(concl, -1) == idx:
+                    del self.facts[concl]
+                    pending.append(concl)
+
+        # 再推导：仍然满足条件的其它规则可以重新推出被删除的事实
+        agenda = deque()
+        for g in removed:
+            for idx in self.network.producers.get(g, ()):
+                if self.counts[idx] == len(rules[idx][1]):
+                    agenda.append(idx)
+        self._run(agenda)
+        return [g for g in removed[1:] if g not in self.facts]
+
+    def toggle(self, fact, selected):
+        return self.assert_fact(fact) if selected else self.retract_fact(fact)
+
+    def _activate(self, fact, agenda):
+        rules = self.network.rules
+        for idx in self.network.alpha.get(fact, ()):
+            self.counts[idx] += 1
+            if self.counts[idx] == len(rules[idx][1]):
+                agenda.append(idx)
+
+    def _run(self, agenda):
+        fired = []
+        rules = self.network.rules
+        while agenda:
+            idx = agenda.popleft()
+            concl = rules[idx][2]
+            if concl in self.facts or self.counts[idx] != len(rules[idx][1]):
+                continue
+            self.facts[concl] = idx
+            fired.append(concl)
+            self._activate(concl, agenda)
+        return fired
+
+    def derived(self):
+        """按推导顺序返回 (规则下标, 结论)"""
+        return [(idx, f) for f, idx in self.facts.items() if idx is not None]
+
+    def proof(self):
+        """当前会话的证明图（按推导顺序）"""
+        rules = self.network.rules
+        return ProofGraph(self.asserted, tuple(rules[idx] for idx, _ in self.derived()), self.network.rule_base)
+
+    def result(self):
+        """返回与 infer_book 相同形式的推理过程与结果"""
+        return self.proof().render()
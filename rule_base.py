@@ -0,0 +1,103 @@
+# rule_base.py
+import sys
+import threading
+import database
+import snapshot
+from database import DEFAULT_DOMAIN, get_all_rules, rules_version, stored_version, domain_label, split_conditions
+
+
+class CompiledRuleBase:
+    """一个领域规则库的只读快照：条件已拆分、去空白并驻留，附带按特征 / 结论的规则索引"""
+
+    def __init__(self, rules, version=0, domain=DEFAULT_DOMAIN, label="图书"):
+        self.version = version   # 该领域的规则版本号
+        self.domain = domain
+        self.label = label       # 领域显示名，用于推理结果的文字
+        self.checked = 0         # 上次确认未过期时的进程内规则版本号
+        self.rules = []          # [(rule_id, 条件元组, 结论)]
+        self.by_feature = {}     # 条件 -> 含有该条件的规则下标
+        self.by_conclusion = {}  # 结论 -> 能推出它的规则下标
+        self._derived = {}
+        self._lock = threading.RLock()  # 派生结构的工厂函数可能再取用其它派生结构
+
+        for rule_id, conds, concl in rules:
+            cond_list = tuple(sys.intern(c) for c in split_conditions(conds or ""))
+            concl = sys.intern((concl or "").strip())
+            if not cond_list or not concl:
+                continue
+            idx = len(self.rules)
+            self.rules.append((rule_id, cond_list, concl))
+            for c in cond_list:
+                self.by_feature.setdefault(c, []).append(idx)
+            self.by_conclusion.setdefault(concl, []).append(idx)
+
+        # 特征词表：所有出现在条件中的特征
+        self.vocabulary = sorted(self.by_feature)
+
+    @classmethod
+    def from_snapshot(cls, snap, version=0, domain=DEFAULT_DOMAIN, label="图书"):
+        """由规则库快照构建：条件已拆分、编号，不必再读规则表、拆分字符串"""
+        rule_base = cls([], version, domain, label)
+        strings = [sys.intern(snap.string(i)) for i in range(snap.string_count)]
+        rule_ids = snap.rule_ids.tolist()
+        conclusions = snap.conclusions.tolist()
+        offsets = snap.cond_offsets.tolist()
+        cond_ids = snap.cond_ids.tolist()
+        rule_base.rules = [
+            (rule_ids[i], tuple([strings[c] for c in cond_ids[offsets[i]:offsets[i + 1]]]), strings[conclusions[i]])
+            for i in range(snap.rule_count)
+        ]
+        post_offsets = snap.post_offsets.tolist()
+        postings = snap.postings
+        for f in range(snap.string_count):
+            if post_offsets[f] != post_offsets[f + 1]:
+                rule_base.by_feature[strings[f]] = postings[post_offsets[f]:post_offsets[f + 1]].tolist()
+        for i, c in enumerate(conclusions):
+            rule_base.by_conclusion.setdefault(strings[c], []).append(i)
+        rule_base.vocabulary = sorted(rule_base.by_feature)
+        return rule_base
+
+    def cached(self, key, factory):
+        """在本快照上缓存派生结构（匹配网络、矩阵等），规则变化后随快照一起失效"""
+        value = self._derived.get(key)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = factory(self)
+        return value
+
+
+_caches = {}  # (数据库路径, 领域) -> 已编译的规则库
+_cache_lock = threading.Lock()
+
+
+def get_rule_base(domain=DEFAULT_DOMAIN):
+    """返回当前进程共享的某个领域的已编译规则库；规则未变化时不访问规则表
+
+    每个领域单独编译、单独失效：其它领域的规则改动只需确认一次该领域的版本号，不会重新编译。
+    """
+    checked = rules_version()
+    key = (database.DB_NAME, domain)  # 不同数据库中同一领域的版本号可能相同
+    rule_base = _caches.get(key)
+    if rule_base is None or rule_base.checked < checked:
+        with _cache_lock:
+            rule_base = _caches.get(key)
+            if rule_base is None or rule_base.checked < checked:
+                version = stored_version(domain)  # 先读版本号：读到的规则只会比它新，下次检查时再重新编译
+                if rule_base is None or rule_base.version != version:
+                    rule_base = _caches[key] = _compile(domain, version)
+                rule_base.checked = checked
+    return rule_base
+
+
+def _compile(domain, version):
+    # 有最新的磁盘快照时直接由快照构建，否则读取规则表
+    label = domain_label(domain)
+    snap = snapshot.open_snapshot(rebuild=False, domain=domain)
+    if snap is None:
+        return CompiledRuleBase(get_all_rules(domain), version, domain, label)
+    try:
+        return CompiledRuleBase.from_snapshot(snap, version, domain, label)
+    finally:
+        snap.close()
@@ -0,0 +1,172 @@
+# rule_io.py
+import argparse
+import csv
+import json
+import os
+import sys
+
+import snapshot
+from database import DEFAULT_DOMAIN, init_db, import_rules, iter_rules
+
+FORMATS = ("csv", "json", "jsonl")
+
+
+def detect_format(path, fmt=None):
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的规则文件格式：{fmt}（可用 {', '.join(FORMATS)}）")
+    return fmt
+
+
+def _rule_from_record(record):
+    """JSON 对象 -> (条件, 结论)；格式不对时返回 ValueError，由 import_rules 计为不合法的行"""
+    if not isinstance(record, dict):
+        return ValueError(f"规则必须是 JSON 对象，而不是 {json.dumps(record, ensure_ascii=False)[:40]}")
+    conditions = record.get("conditions", "")
+    if isinstance(conditions, (list, tuple)) and all(isinstance(c, str) for c in conditions):
+        conditions = ",".join(conditions)
+    conclusion = record.get("conclusion", "")
+    if not isinstance(conditions, str) or not isinstance(conclusion, str):
+        return ValueError("条件必须是字符串或字符串数组，结论必须是字符串")
+    return conditions, conclusion
+
+
+def read_rules(stream, fmt):
+    """从文件流中逐条读取 (条件, 结论)，不会一次载入整个文件"""
+    if fmt == "csv":
+        reader = csv.reader(stream)
+        for i, row in enumerate(reader):
+            if i == 0 and [c.strip().lower() for c in row[:2]] == ["conditions", "conclusion"]:
+                continue  # 表头
+            if row:
+                yield (row[0], row[1] if len(row) > 1 else "")
+    elif fmt == "jsonl":
+        for line in stream:
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield ValueError(f"JSON 解析失败：{e}")
+                    continue
+                yield _rule_from_record(record)
+    else:
+        for record in _iter_json_array(stream):
+            yield _rule_from_record(record)
+
+
+def _iter_json_array(stream, chunk_size=64 * 1024):
+    """增量解析 JSON 数组，每解析出一个元素就返回，内存只保留一个缓冲区"""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # 跳过空白和分隔符
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = stream.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+        if not started:
+            if pos >= len(buf) or buf[pos] != "[":
+                raise ValueError("JSON 规则文件必须是一个数组")
+            started = True
+            pos += 1
+            continue
+        if pos >= len(buf):
+            raise ValueError("JSON 数组没有正确结束")
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise
+            chunk = stream.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        yield obj
+        buf, pos = buf[end:], 0
+
+
+def write_rules(stream, fmt, rules):
+    """把 (id, 条件, 结论) 逐行写出"""
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(["conditions", "conclusion", "id"])
+        for rule_id, conditions, conclusion in rules:
+            writer.writerow([conditions, conclusion, rule_id])
+    elif fmt == "jsonl":
+        for rule_id, conditions, conclusion in rules:
+            stream.write(json.dumps({"id": rule_id, "conditions": conditions, "conclusion": conclusion},
+                                    ensure_ascii=False) + "\n")
+    else:
+        stream.write("[")
+        for i, (rule_id, conditions, conclusion) in enumerate(rules):
+            stream.write(",\n  " if i else "\n  ")
+            stream.write(json.dumps({"id": rule_id, "conditions": conditions, "conclusion": conclusion},
+                                    ensure_ascii=False))
+        stream.write("\n]\n")
+
+
+def import_file(path, fmt=None, mode="append", dry_run=False, strict=False, domain=DEFAULT_DOMAIN, cancelled=None):
+    """导入规则文件到领域 domain（整个文件在一个事务中写入，失败或取消时不会留下半截数据）"""
+    fmt = detect_format(path, fmt)
+    with open(path, encoding="utf-8", newline="") as f:
+        summary = import_rules(read_rules(f, fmt), mode=mode, dry_run=dry_run, strict=strict, domain=domain,
+                               cancelled=cancelled)
+    if not dry_run and os.path.exists(snapshot.snapshot_path(domain=domain)):
+        snapshot.ensure_snapshot(domain=domain)  # 大批量修改后顺带刷新规则库快照
+    return summary
+
+
+def export_file(path, fmt=None, domain=DEFAULT_DOMAIN):
+    """用游标流式导出领域的全部规则，返回导出的条数"""
+    fmt = detect_format(path, fmt)
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in iter_rules(domain=domain):
+            count += 1
+            yield row
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        write_rules(f, fmt, counted())
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量导入 / 导出规则（CSV / JSON / JSONL）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="导入规则文件")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=FORMATS)
+    imp.add_argument("--mode", choices=["append", "skip", "upsert"], default="append",
+                     help="append 全部新增；skip 跳过条件集合重复的规则；upsert 条件集合相同时更新结论")
+    imp.add_argument("--dry-run", action="store_true", help="只校验并统计，不写入数据库")
+    imp.add_argument("--strict", action="store_true", help="遇到不合法的行时整体回滚")
+    exp = sub.add_parser("export", help="导出全部规则")
+    exp.add_argument("path")
+    exp.add_argument("--format", choices=FORMATS)
+    for p in (imp, exp):
+        p.add_argument("--domain", default=DEFAULT_DOMAIN, help="规则库领域（默认 book）")
+    args = parser.parse_args(argv)
+
+    init_db()
+    if args.command == "import":
+        summary = import_file(args.path, args.format, args.mode, args.dry_run, args.strict, args.domain)
+        for error in summary["errors"]:
+            print(f"⚠ {error}", file=sys.stderr)
+        prefix = "（试运行，未写入）" if args.dry_run else ""
+        print(f"✅ {prefix}新增 {summary['inserted']} 条，更新 {summary['updated']} 条，"
+              f"跳过 {summary['skipped']} 条，不合法 {summary['invalid']} 条")
+    else:
+        print(f"✅ 已导出 {export_file(args.path, args.format, args.domain)} 条规则到: {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,31 +14,154 @@
 #     return "未找到符合条件的书籍，请尝试输入更多特征。"
 
 # rules_engine.py
-from database import get_all_rules
+import threading
+import time
+import profiling
+from cache import LRUCache
+from database import DEFAULT_DOMAIN
+from rule_base import get_rule_base
+from analyzer import evaluation_plan
+from proof import ProofGraph
 
-def infer_book(features):
+# 推理结果缓存：每个领域一个，以（特征集合, 规则库版本）为键，该领域的规则被修改后自动清空
+_result_caches = {}
+_cache_settings = {"maxsize": 4096, "ttl": None}
+_caches_lock = threading.Lock()
+
+
+def _result_cache(rule_base):
+    cache = _result_caches.get(rule_base.domain)
+    if cache is None:
+        with _caches_lock:
+            cache = _result_caches.get(rule_base.domain)
+            if cache is None:
+                cache = _result_caches[rule_base.domain] = LRUCache(**_cache_settings)
+    cache.set_version(rule_base)  # 以规则库对象为版本：切换数据库后同一版本号也可能对应不同规则
+    return cache
+
+
+def configure_cache(maxsize=None, ttl=None):
+    """调整各领域推理结果缓存的容量与过期时间（秒，None 表示不过期）"""
+    with _caches_lock:
+        if maxsize is not None:
+            _cache_settings["maxsize"] = maxsize
+        _cache_settings["ttl"] = ttl
+        for cache in _result_caches.values():
+            cache.maxsize = _cache_settings["maxsize"]
+            cache.ttl = ttl
+            cache.clear()
+
+
+def cache_stats(domain=None):
+    """返回推理结果缓存的命中 / 未命中 / 淘汰统计；不给 domain 时返回 {领域: 统计}"""
+    if domain is not None:
+        cache = _result_caches.get(domain)
+        return cache.stats() if cache is not None else LRUCache(**_cache_settings).stats()
+    return {name: cache.stats() for name, cache in list(_result_caches.items())}
+
+
+def profile_snapshot(domain=DEFAULT_DOMAIN):
+    """返回推理与数据库调用的统计快照（需先 profiling.enable()），含从未触发的规则"""
+    return profiling.snapshot([rule_id for rule_id, _, _ in get_rule_base(domain).rules])
+
+
+def infer(features, domain=DEFAULT_DOMAIN):
+    """在领域 domain 的规则库上根据输入特征进行推理，返回证明图 ProofGraph（推理过程的文字按需生成）"""
+    if profiling.enabled:
+        return _infer_profiled(features, domain)
+    rule_base = get_rule_base(domain)
+    cache = _result_cache(rule_base)
+    key = (frozenset(features), rule_base.version)
+    proof = cache.get(key)
+    if proof is None:
+        proof = _infer(rule_base, features)
+        cache.put(key, proof)
+    return proof
+
+
+def infer_book(features, domain=DEFAULT_DOMAIN):
     """根据输入特征进行推理，返回推理过程与结果"""
-    rules = get_all_rules()
+    return infer(features, domain).render()
+
+
+def _infer(rule_base, features):
+    return ProofGraph(features, _saturate(evaluation_plan(rule_base), features), rule_base)
+
+
+def _saturate(plan, features):
+    """返回按触发顺序的规则"""
+    known_facts = set(features)
+    fired = []
+
+    # 按依赖分层求值：每层的条件只来自更低的层，不含环的层扫描一遍即可，
+    # 含环的层在本层内不断尝试，直到没有新结论产生
+    for rules, recursive in plan:
+        inferred = True
+        while inferred:
+            inferred = False
+            for rule in rules:
+                concl = rule[2]
+                if concl not in known_facts and all(c in known_facts for c in rule[1]):
+                    fired.append(rule)
+                    known_facts.add(concl)
+                    inferred = recursive
+    return tuple(fired)
+
+
+def _infer_profiled(features, domain=DEFAULT_DOMAIN):
+    """带统计的推理：分别计时规则加载、匹配与结论选择，并统计每条规则的评估 / 触发次数"""
+    t0 = time.perf_counter()
+    rule_base = get_rule_base(domain)
+    cache = _result_cache(rule_base)
+    key = (frozenset(features), rule_base.version)
+    proof = cache.get(key)
+    t1 = time.perf_counter()
+    if proof is not None:
+        profiling.record_query({"load": t1 - t0}, 0, {}, cache_hit=True)
+        return proof
+
+    plan = evaluation_plan(rule_base)
     known_facts = set(features)
-    reasoning_steps = []
-    inferred = True
-
-    # 不断尝试用规则推理，直到没有新结论产生
-    while inferred:
-        inferred = False
-        for _, conds, concl in rules:
-            cond_list = [c.strip() for c in conds.split(',')]
-            if all(c in known_facts for c in cond_list) and concl not in known_facts:
-                reasoning_steps.append(f"{'、'.join(cond_list)} → {concl}")
-                known_facts.add(concl)
-                inferred = True
-
-    # 根据最终结论推测结果
-    possible_results = [fact for fact in known_facts if fact not in features]
-
-    if len(possible_results) > 0:
-        final = possible_results[-1]  # 最后推导出的事实
-        reasoning_steps.append(f"✅ 最终结论：{final}")
-        return reasoning_steps, f"所识别的图书为：{final}"
-    else:
-        return reasoning_steps, "❌ 无法根据当前条件得出结论"
+    fired = []
+    rule_counts = {}
+    passes = 0  # 各层扫描次数之和
+    for rules, recursive in plan:
+        inferred = True
+        while inferred:
+            inferred = False
+            passes += 1
+            for rule in rules:
+                rule_id, cond_list, concl = rule
+                if concl in known_facts:
+                    continue
+                counts = rule_counts.get(rule_id)
+                if counts is None:
+                    counts = rule_counts[rule_id] = [0, 0]
+                counts[0] += 1
+                if all(c in known_facts for c in cond_list):
+                    counts[1] += 1
+                    fired.append(rule)
+                    known_facts.add(concl)
+                    inferred = recursive
+    t2 = time.perf_counter()
+    proof = ProofGraph(features, tuple(fired), rule_base)
+    proof.final  # 结论选择计入 select 阶段
+    t3 = time.perf_counter()
+
+    cache.put(key, proof)
+    profiling.record_query({"load": t1 - t0, "match": t2 - t1, "select": t3 - t2}, passes, rule_counts)
+    return proof
+
+
+def infer_batch(feature_sets, chunk_size=4096, domain=DEFAULT_DOMAIN):
+    """一次推理多组特征，返回 ProofGraph 列表
+
+    规则表只读取、编译一次，所有查询按矩阵运算同时推理到不动点。
+    """
+    from batch_engine import RuleMatrix  # numpy 仅在批量推理时需要
+    return RuleMatrix.from_database(domain).prove(feature_sets, chunk_size=chunk_size)
+
+
+def infer_book_batch(feature_sets, chunk_size=4096, domain=DEFAULT_DOMAIN):
+    """一次推理多组特征，返回与 infer_book 相同形式的 [(推理过程, 结果), ...]"""
+    return [proof.render() for proof in infer_batch(feature_sets, chunk_size, domain)]
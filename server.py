@@ -0,0 +1,327 @@
+# server.py
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from database import (DEFAULT_DOMAIN, init_db, get_all_rules, add_rule, update_rule, delete_rule,
+                      get_domains, has_domain)
+from rules_engine import infer, cache_stats
+from rule_base import get_rule_base
+from backward import which_hold
+from analyzer import check_rule
+from ranking import rank_conclusions, METRICS
+
+MAX_BODY = 1024 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Metrics:
+    """按路由统计请求数、错误数、延迟分位数和吞吐量"""
+
+    def __init__(self, window=60.0, samples=2048):
+        self.started = time.monotonic()
+        self.window = window
+        self.routes = {}
+        self.recent = deque()  # 最近 window 秒内完成请求的时间点
+        self.samples = samples
+
+    def observe(self, route, latency, ok):
+        stats = self.routes.setdefault(route, {"count": 0, "errors": 0, "latencies": deque(maxlen=self.samples)})
+        stats["count"] += 1
+        if not ok:
+            stats["errors"] += 1
+        stats["latencies"].append(latency)
+        now = time.monotonic()
+        self.recent.append(now)
+        while self.recent and now - self.recent[0] > self.window:
+            self.recent.popleft()
+
+    def snapshot(self):
+        """请求统计的快照；只读写内存中的计数，必须在事件循环线程中调用（observe 也在那里修改 routes）"""
+        uptime = time.monotonic() - self.started
+        total = sum(s["count"] for s in self.routes.values())
+        routes = {}
+        for route, s in self.routes.items():
+            lat = sorted(s["latencies"])
+            routes[route] = {
+                "count": s["count"],
+                "errors": s["errors"],
+                "p50_ms": _percentile(lat, 0.50),
+                "p95_ms": _percentile(lat, 0.95),
+                "p99_ms": _percentile(lat, 0.99),
+            }
+        return {
+            "uptime_s": round(uptime, 3),
+            "requests": total,
+            "throughput_rps": round(total / uptime, 2) if uptime else 0.0,
+            "recent_rps": round(len(self.recent) / min(self.window, uptime), 2) if uptime else 0.0,
+            "routes": routes,
+        }
+
+
+def _engine_stats():
+    """规则库版本和结果缓存统计；可能需要编译规则库，在线程池中调用"""
+    return {
+        "rule_base_version": get_rule_base().version,  # 默认领域
+        "result_cache": cache_stats(),
+    }
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return round(sorted_values[idx] * 1000, 3)
+
+
+class InferenceService:
+    """无界面的推理服务：推理使用进程内共享的已编译规则库
+
+    事件循环只负责收发请求：推理（可能要重新编译规则库）和读数据库在 readers 线程池中执行，
+    写数据库在 executor 线程池中执行。
+    """
+
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="db-writer")
+        self.readers = ThreadPoolExecutor(max_workers, thread_name_prefix="inference")
+        self.metrics = Metrics()
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        if body is not None and not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "请求体必须是 JSON 对象")
+        loop = asyncio.get_running_loop()
+        if method == "GET" and parts == ["health"]:
+            return "health", HTTPStatus.OK, {"status": "ok"}
+        if method == "GET" and parts == ["metrics"]:
+            snapshot = self.metrics.snapshot()
+            snapshot.update(await loop.run_in_executor(self.readers, _engine_stats))
+            return "metrics", HTTPStatus.OK, snapshot
+        if method == "GET" and parts == ["domains"]:
+            return "domains", HTTPStatus.OK, await loop.run_in_executor(self.readers, self.domains)
+        if method == "POST" and parts == ["infer"]:
+            return "infer", HTTPStatus.OK, await loop.run_in_executor(self.readers, self.infer, body)
+        if method == "POST" and parts == ["prove"]:
+            return "prove", HTTPStatus.OK, await loop.run_in_executor(self.readers, self.prove, body)
+        if method == "POST" and parts == ["suggest"]:
+            return "suggest", HTTPStatus.OK, await loop.run_in_executor(self.readers, self.suggest, body)
+        if parts[:1] == ["rules"]:
+            return await self.rules(method, parts[1:], body, query)
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"未知路径：{method} {url.path}")
+
+    def domains(self):
+        return [{"name": name, "label": label} for name, label in get_domains()]
+
+    def infer(self, body):
+        """{"features": [...], "explain": true, "domain": "book"}；explain 为 false 时只返回结论与触发的规则，不生成推理过程"""
+        features = (body or {}).get("features")
+        if not isinstance(features, list) or not all(isinstance(f, str) for f in features):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "features 必须是字符串列表")
+        proof = infer(features, _domain(body))
+        response = {"features": features}
+        response.update(proof.to_dict())
+        if body.get("explain", True):
+            response["steps"], response["result"] = proof.render()
+        return response
+
+    def prove(self, body):
+        """反向推理：{"features": [...], "goals": [...]}，返回每个目标是否成立及证明步骤"""
+        features = (body or {}).get("features")
+        goals = (body or {}).get("goals")
+        if (not isinstance(features, list) or not isinstance(goals, list) or not goals
+                or not all(isinstance(f, str) for f in features + goals)):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "features 和 goals 必须是字符串列表")
+        results = which_hold(goals, features, _domain(body))
+        return {
+            goal: {"holds": proof is not None, "steps": proof.steps() if proof else [],
+                   "rules": proof.rule_ids() if proof else []}
+            for goal, proof in results.items()
+        }
+
+    def suggest(self, body):
+        """按条件重合度返回最接近的 k 个结论：{"features": [...], "k": 5, "metric": "jaccard", "threshold": 0}"""
+        body = body or {}
+        features = body.get("features")
+        if not isinstance(features, list) or not all(isinstance(f, str) for f in features):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "features 必须是字符串列表")
+        metric = body.get("metric", "jaccard")
+        if metric not in METRICS:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"metric 只能是 {', '.join(METRICS)}")
+        try:
+            k = int(body.get("k", 5))
+            threshold = float(body.get("threshold", 0.0))
+        except (TypeError, ValueError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "k 和 threshold 必须是数字")
+        return {"features": features,
+                "suggestions": rank_conclusions(features, k, metric, threshold, domain=_domain(body))}
+
+    async def rules(self, method, rest, body, query):
+        """规则增删改查；领域由查询参数 ?domain= 给出（新增时也可以写在请求体中），默认 book"""
+        loop = asyncio.get_running_loop()
+        domain = query.get("domain", [None])[0] or (body or {}).get("domain") or DEFAULT_DOMAIN
+        if method == "GET" and not rest:
+            rows = await loop.run_in_executor(self.executor, get_all_rules, domain)
+            return "rules.list", HTTPStatus.OK, [_rule_json(r) for r in rows]
+        if method == "POST" and not rest:
+            conditions, conclusion = _rule_fields(body)
+            if not isinstance(domain, str):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "domain 必须是字符串")
+            warnings = await loop.run_in_executor(self.readers, check_rule, conditions, conclusion, None, None, domain)
+            rule_id = await loop.run_in_executor(self.executor, add_rule, conditions, conclusion, domain)
+            return "rules.add", HTTPStatus.CREATED, {"id": rule_id, "conditions": conditions, "conclusion": conclusion,
+                                                      "domain": domain, "warnings": warnings}
+        if len(rest) == 1 and rest[0].isdigit():
+            rule_id = int(rest[0])
+            if method == "PUT":
+                conditions, conclusion = _rule_fields(body)
+                warnings = await loop.run_in_executor(self.readers, check_rule, conditions, conclusion, None, rule_id,
+                                                      domain)
+                if not await loop.run_in_executor(self.executor, update_rule, rule_id, conditions, conclusion, domain):
+                    raise HTTPError(HTTPStatus.NOT_FOUND, f"领域 {domain} 中没有规则 {rule_id}")
+                return "rules.update", HTTPStatus.OK, {"id": rule_id, "conditions": conditions, "conclusion": conclusion,
+                                                       "warnings": warnings}
+            if method == "DELETE":
+                if not await loop.run_in_executor(self.executor, delete_rule, rule_id, domain):
+                    raise HTTPError(HTTPStatus.NOT_FOUND, f"领域 {domain} 中没有规则 {rule_id}")
+                return "rules.delete", HTTPStatus.OK, {"id": rule_id}
+        raise HTTPError(HTTPStatus.NOT_FOUND, "未知的规则操作")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, body, keep_alive = request
+                start = time.perf_counter()
+                route = "unknown"
+                try:
+                    route, status, payload = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:  # 不让单个请求的异常中断整个服务
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+                self.metrics.observe(route, time.perf_counter() - start, status < 400)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            writer.write(_response(e.status, {"error": str(e)}, False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _domain(body):
+    """请求体中的 domain（默认 book）；未知的领域返回 404，不为它编译空规则库"""
+    domain = (body or {}).get("domain", DEFAULT_DOMAIN)
+    if not isinstance(domain, str):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "domain 必须是字符串")
+    if domain != DEFAULT_DOMAIN and not has_domain(domain):
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"未知的领域：{domain}")
+    return domain
+
+
+def _rule_json(row):
+    return {"id": row[0], "conditions": row[1], "conclusion": row[2]}
+
+
+def _rule_fields(body):
+    conditions = str((body or {}).get("conditions", "")).strip()
+    conclusion = str((body or {}).get("conclusion", "")).strip()
+    if not conditions or not conclusion:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "条件和结论不能为空")
+    return conditions, conclusion
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "请求行格式错误")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length 必须是整数")
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length 不能为负数")
+    if length > MAX_BODY:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "请求体过大")
+    body = None
+    if length:
+        raw = await reader.readexactly(length)
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "请求体不是合法的 JSON")
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method.upper(), target, body, keep_alive
+
+
+def _response(status, payload, keep_alive):
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    status = HTTPStatus(status)
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + data
+
+
+async def start_server(host="127.0.0.1", port=8080, service=None):
+    """启动服务并返回 (asyncio.Server, InferenceService)；port 为 0 时自动选择空闲端口"""
+    service = service or InferenceService()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(service.executor, init_db)
+    await loop.run_in_executor(service.readers, get_rule_base)  # 预先编译规则库，第一个请求不用等待
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    return server, service
+
+
+async def serve(host, port):
+    server, _ = await start_server(host, port)
+    addr = server.sockets[0].getsockname()
+    print(f"✅ 推理服务已启动: http://{addr[0]}:{addr[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="无界面的推理 HTTP 服务（图书、动物等各领域规则库）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,287 @@
+# snapshot.py
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+
+import database
+
+# 每个领域一个快照文件。文件格式（小端）：
+#   头部   MAGIC, 领域的规则版本号, 规则数, 字符串数, 条件总数
+#   rule_ids      int64[规则数]            数据库中的规则 ID
+#   conclusions   int32[规则数]            结论的字符串编号
+#   cond_offsets  int64[规则数 + 1]        第 i 条规则的条件为 cond_ids[cond_offsets[i]:cond_offsets[i+1]]
+#   cond_ids      int32[条件总数]
+#   post_offsets  int64[字符串数 + 1]      特征 f 出现在 postings[post_offsets[f]:post_offsets[f+1]] 这些规则中
+#   postings      int32[条件总数]
+#   str_offsets   int64[字符串数 + 1]      按 UTF-8 字节排序的字符串表，可二分查找
+#   str_data      bytes
+MAGIC = b"RBSNAP02"  # 01 记录的是全局版本号
+_HEADER = struct.Struct("<8sqqqq")
+
+
+def snapshot_path(db_name=None, domain=database.DEFAULT_DOMAIN):
+    base = db_name or database.DB_NAME
+    return base + ".snapshot" if domain == database.DEFAULT_DOMAIN else f"{base}.{domain}.snapshot"
+
+
+def _pad(f):
+    # 各数组按 8 字节对齐，便于直接按 int64 视图读取
+    f.write(b"\0" * (-f.tell() % 8))
+
+
+def write_snapshot(path=None, domain=database.DEFAULT_DOMAIN):
+    """从数据库编译一个领域的规则库并原子地写出快照，返回快照对应的规则版本号"""
+    path = path or snapshot_path(domain=domain)
+    conn = database.get_connection()
+    conn.execute("BEGIN")  # 版本号与规则在同一个读事务中读取，保证一致
+    try:
+        version = database.stored_version(domain)
+        ids = {}
+        rule_ids = array("q")
+        conclusions = array("i")
+        cond_offsets = array("q", [0])
+        cond_ids = array("i")
+        for rule_id, conds, concl in database.iter_rules(batch_size=10000, domain=domain):
+            cond_list = database.split_conditions(conds or "")
+            concl = (concl or "").strip()
+            if not cond_list or not concl:
+                continue
+            rule_ids.append(rule_id)
+            conclusions.append(ids.setdefault(concl, len(ids)))
+            cond_ids.extend(ids.setdefault(c, len(ids)) for c in cond_list)
+            cond_offsets.append(len(cond_ids))
+    finally:
+        conn.execute("COMMIT")
+
+    # 字符串按 UTF-8 字节排序后重新编号，打开快照时无需建字典即可二分查找
+    encoded = sorted((s.encode("utf-8"), i) for s, i in ids.items())
+    remap = array("i", bytes(4 * len(encoded)))
+    str_offsets = array("q", [0])
+    total = 0
+    for new_id, (data, old_id) in enumerate(encoded):
+        remap[old_id] = new_id
+        total += len(data)
+        str_offsets.append(total)
+    conclusions = array("i", (remap[c] for c in conclusions))
+    cond_ids = array("i", (remap[c] for c in cond_ids))
+
+    # 倒排表：计数排序，规则按下标升序排列
+    counts = array("q", bytes(8 * (len(encoded) + 1)))
+    for c in cond_ids:
+        counts[c + 1] += 1
+    for i in range(1, len(counts)):
+        counts[i] += counts[i - 1]
+    post_offsets = array("q", counts)
+    postings = array("i", bytes(4 * len(cond_ids)))
+    fill = array("q", counts[:-1])
+    for rule in range(len(rule_ids)):
+        for pos in range(cond_offsets[rule], cond_offsets[rule + 1]):
+            c = cond_ids[pos]
+            postings[fill[c]] = rule
+            fill[c] += 1
+
+    if sys.byteorder != "little":
+        for arr in (rule_ids, conclusions, cond_offsets, cond_ids, post_offsets, postings, str_offsets):
+            arr.byteswap()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, version, len(rule_ids), len(encoded), len(cond_ids)))
+            for arr in (rule_ids, conclusions, cond_offsets, cond_ids, post_offsets, postings, str_offsets):
+                _pad(f)
+                arr.tofile(f)
+            for data, _ in encoded:
+                f.write(data)
+        os.replace(tmp, path)  # 正在使用旧快照的进程仍持有旧文件，不受影响
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return version
+
+
+class _Strings:
+    """字符串表的只读序列视图（按需解码，不复制整张表）"""
+
+    def __init__(self, snap):
+        self._snap = snap
+
+    def __len__(self):
+        return self._snap.string_count
+
+    def __getitem__(self, i):
+        return self._snap.string(i)
+
+
+class _StringIndex:
+    """字符串 -> 编号 的只读映射视图（二分查找）"""
+
+    def __init__(self, snap):
+        self._snap = snap
+
+    def __contains__(self, s):
+        return self._snap.string_id(s) is not None
+
+    def __getitem__(self, s):
+        i = self._snap.string_id(s)
+        if i is None:
+            raise KeyError(s)
+        return i
+
+    def get(self, s, default=None):
+        i = self._snap.string_id(s)
+        return default if i is None else i
+
+
+class _Rules:
+    """第 i 条规则的 (rule_id, 条件元组, 结论)（按需解码）"""
+
+    def __init__(self, snap):
+        self._snap = snap
+
+    def __len__(self):
+        return self._snap.rule_count
+
+    def __getitem__(self, rule):
+        return self._snap.rule(rule)
+
+
+class _ConditionFacts:
+    """在规则条件中出现过的事实（只支持 in 判断）"""
+
+    def __init__(self, snap):
+        self._snap = snap
+
+    def __contains__(self, s):
+        f = self._snap.string_id(s)
+        return f is not None and self._snap.post_offsets[f] != self._snap.post_offsets[f + 1]
+
+
+class _SortedKeys:
+    def __init__(self, snap):
+        self._snap = snap
+
+    def __len__(self):
+        return self._snap.string_count
+
+    def __getitem__(self, i):
+        return self._snap._raw_string(i)
+
+
+class RuleSnapshot:
+    """用 mmap 打开的只读规则库快照；多个进程打开同一文件时共享同一份物理内存"""
+
+    def __init__(self, path, domain=database.DEFAULT_DOMAIN):
+        self.path = path
+        self.domain = domain
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, n_rules, n_strings, n_conds = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"不是规则库快照文件：{path}")
+        if sys.byteorder != "little":
+            self._mmap.close()
+            raise ValueError("规则库快照只支持小端机器")
+        self.rule_count = n_rules
+        self.string_count = n_strings
+        self._buf = memoryview(self._mmap)
+        pos = _HEADER.size
+        sections = {}
+        for name, fmt, count in (("rule_ids", "q", n_rules), ("conclusions", "i", n_rules),
+                                 ("cond_offsets", "q", n_rules + 1), ("cond_ids", "i", n_conds),
+                                 ("post_offsets", "q", n_strings + 1), ("postings", "i", n_conds),
+                                 ("str_offsets", "q", n_strings + 1)):
+            pos += -pos % 8
+            size = count * struct.calcsize(fmt)
+            sections[name] = (pos, count, fmt)
+            setattr(self, name, self._buf[pos:pos + size].cast(fmt))
+            pos += size
+        self.sections = sections  # 名称 -> (文件内偏移, 元素个数, 类型)，供 numpy.frombuffer 使用
+        self._str_data = pos
+        self.strings = _Strings(self)
+        self.string_index = _StringIndex(self)
+        self.rules = _Rules(self)
+        self.condition_facts = _ConditionFacts(self)
+
+    def close(self):
+        for name in self.sections:
+            getattr(self, name).release()
+        self._buf.release()
+        self._mmap.close()
+
+    def _raw_string(self, i):
+        start = self._str_data + self.str_offsets[i]
+        return self._mmap[start:self._str_data + self.str_offsets[i + 1]]
+
+    def string(self, i):
+        return self._raw_string(i).decode("utf-8")
+
+    def string_id(self, s):
+        """字符串的编号，不存在时返回 None"""
+        data = s.encode("utf-8")
+        i = bisect_left(_SortedKeys(self), data)
+        if i < self.string_count and self._raw_string(i) == data:
+            return i
+        return None
+
+    def conditions(self, rule):
+        """第 rule 条规则（快照内下标）的条件编号"""
+        return self.cond_ids[self.cond_offsets[rule]:self.cond_offsets[rule + 1]]
+
+    def rule(self, rule):
+        """返回 (rule_id, 条件元组, 结论)，与 CompiledRuleBase.rules 的元素相同"""
+        return (self.rule_ids[rule], tuple(self.string(c) for c in self.conditions(rule)),
+                self.string(self.conclusions[rule]))
+
+    def is_current(self):
+        return self.version == database.stored_version(self.domain)
+
+
+def open_snapshot(path=None, rebuild=True, domain=database.DEFAULT_DOMAIN):
+    """打开领域的快照；文件不存在或与数据库中的规则版本不一致时（rebuild 为真）自动重建"""
+    path = path or snapshot_path(domain=domain)
+    snap = None
+    if os.path.exists(path):
+        try:
+            snap = RuleSnapshot(path, domain)
+        except (ValueError, struct.error):
+            snap = None
+        if snap is not None and not snap.is_current():
+            snap.close()
+            snap = None
+    if snap is None:
+        if not rebuild:
+            return None
+        write_snapshot(path, domain)
+        snap = RuleSnapshot(path, domain)
+    return snap
+
+
+def ensure_snapshot(path=None, domain=database.DEFAULT_DOMAIN):
+    """快照过期时重建，返回快照对应的规则版本号"""
+    snap = open_snapshot(path, domain=domain)
+    version = snap.version
+    snap.close()
+    return version
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="重建规则库的二进制快照（供批量推理工作进程用 mmap 共享）")
+    parser.add_argument("--db", default=database.DB_NAME, help="规则数据库路径")
+    parser.add_argument("--domain", default=database.DEFAULT_DOMAIN, help="规则库领域（默认 book）")
+    parser.add_argument("--force", action="store_true", help="即使快照未过期也重新生成")
+    args = parser.parse_args()
+    database.DB_NAME = args.db
+    database.init_db()
+    if args.force:
+        version = write_snapshot(domain=args.domain)
+    else:
+        version = ensure_snapshot(domain=args.domain)
+    print(f"✅ 规则库快照已是最新（版本 {version}）: {snapshot_path(domain=args.domain)}")
@@ -0,0 +1,62 @@
+# startup.py
+import json
+import subprocess
+import sys
+import time
+
+
+class StartupTimer:
+    """记录启动各阶段的时间点，用于跟踪“冷启动到窗口可用”的耗时"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.start))
+
+    def report(self, imports=None):
+        """返回可写成 JSON 的报告：各阶段累计耗时（毫秒）与模块导入耗时"""
+        data = {
+            "phases_ms": {name: round(t * 1000, 2) for name, t in self.marks},
+            "total_ms": round(self.marks[-1][1] * 1000, 2) if self.marks else 0.0,
+        }
+        if imports is not None:
+            data["imports"] = imports
+        return data
+
+
+def import_times(module="gui", top=15):
+    """在子进程中用 python -X importtime 导入模块，返回累计耗时最多的若干个模块（微秒）"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    rows.sort(key=lambda r: r["cumulative_us"], reverse=True)
+    return rows[:top]
+
+
+def print_report(report):
+    print("启动耗时（自 main.py 开始执行起累计，毫秒）：")
+    for name, ms in report["phases_ms"].items():
+        print(f"  {name:<20}{ms:>10.1f}")
+    if report.get("imports"):
+        print("导入耗时最多的模块（累计，毫秒）：")
+    for row in report.get("imports", []):
+        print(f"  {row['module']:<40}{row['cumulative_us'] / 1000:>10.1f}")
+
+
+def write_report(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,55 @@
+# tests/conftest.py
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """每个测试使用临时目录中的新数据库（含示例领域）"""
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "system.db"))
+    database.init_db()
+    yield database
+    database.close_connection()
+
+
+def random_rules(rng, n_facts=30, n_rules=80, n_inputs=10, cyclic=False):
+    """随机规则 [(条件, 结论)]：事实 f0..f{n_facts-1}，前 n_inputs 个只作为输入特征
+
+    不含环时条件只取编号更小的事实；cyclic 为真时条件可以取任意非输入事实。
+    """
+    rules = []
+    while len(rules) < n_rules:
+        concl = rng.randrange(n_inputs, n_facts)
+        pool = [i for i in range(n_facts if cyclic else concl) if i != concl]
+        conds = rng.sample(pool, rng.randint(1, min(3, len(pool))))
+        rules.append((",".join(f"f{i}" for i in conds), f"f{concl}"))
+    return rules
+
+
+def random_queries(rng, count, n_inputs=10):
+    return [[f"f{i}" for i in rng.sample(range(n_inputs), rng.randint(1, 6))] for _ in range(count)]
+
+
+def saturate(rules, features):
+    """最朴素的前向推理：反复扫描全部规则直到没有新事实，作为各引擎的对照"""
+    facts = set(features)
+    changed = True
+    while changed:
+        changed = False
+        for conds, concl in rules:
+            if concl not in facts and all(c in facts for c in conds.split(",")):
+                facts.add(concl)
+                changed = True
+    return facts
+
+
+@pytest.fixture
+def rng():
+    return random.Random(20240501)
@@ -0,0 +1,55 @@
+# tests/test_backward.py
+from conftest import random_rules, saturate
+from backward import Prover
+from rule_base import CompiledRuleBase
+
+
+def _check_proof(proof, features):
+    """证明树的每个结论都由对应规则从各子证明推出，叶子都是输入特征"""
+    if proof.rule is None:
+        assert proof.fact in features
+        return
+    _, cond_list, concl = proof.rule
+    assert concl == proof.fact
+    assert [p.fact for p in proof.premises] == list(cond_list)
+    for p in proof.premises:
+        _check_proof(p, features)
+
+
+def test_tabled_proofs_match_saturation_with_cycles(rng):
+    """含环的规则库上，同一个 Prover 按随机顺序证明所有目标，结果与前向推理一致"""
+    for n in range(60):
+        rules = random_rules(rng, n_facts=20, n_rules=40, n_inputs=6, cyclic=True)
+        rule_base = CompiledRuleBase([(i + 1, conds, concl) for i, (conds, concl) in enumerate(rules)])
+        features = [f"f{i}" for i in rng.sample(range(6), rng.randint(1, 4))]
+        facts = saturate(rules, features)
+        goals = [f"f{i}" for i in range(20)]
+        rng.shuffle(goals)
+        prover = Prover(rule_base, features)
+        for goal in goals + goals:  # 第二遍全部来自子目标表
+            proof = prover.prove(goal)
+            assert (proof is not None) == (goal in facts), goal
+            if proof is not None:
+                _check_proof(proof, features)
+
+
+def test_cycle_does_not_poison_table():
+    """a、b 相互依赖：证明 a 时 b 暂时失败，但 b 另有依据，之后再证明 b 仍然成立"""
+    rule_base = CompiledRuleBase([(1, "b", "a"), (2, "a", "b"), (3, "x", "b")])
+    prover = Prover(rule_base, ["x"])
+    assert prover.prove("a").rule_ids() == [1, 3]
+    assert prover.prove("b").rule_ids() == [3]
+    assert Prover(rule_base, ["y"]).prove("a") is None
+
+
+def test_deep_chain_does_not_recurse():
+    """3000 层的链式规则库：证明和 steps() 都不受递归深度限制"""
+    depth = 3000
+    rule_base = CompiledRuleBase([(i + 1, f"c{i}", f"c{i + 1}") for i in range(depth)])
+    proof = Prover(rule_base, ["c0"]).prove(f"c{depth}")
+    assert proof is not None
+    steps = proof.steps()
+    assert len(steps) == depth
+    assert steps[0] == "c0 → c1" and steps[-1] == f"c{depth - 1} → c{depth}"
+    assert len(proof.rule_ids()) == depth
+    assert Prover(rule_base, ["x"]).prove(f"c{depth}") is None
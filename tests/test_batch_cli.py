@@ -0,0 +1,49 @@
+# tests/test_batch_cli.py
+import io
+import json
+
+import pytest
+
+import batch_cli
+import database
+from batch_cli import Checkpoint, run
+
+
+def _queries(n):
+    pool = ["有毛发", "吃肉", "黄褐色", "有斑点", "有羽毛", "善飞", "有蹄", "有黑色条纹"]
+    return "".join(json.dumps(pool[i % 4:i % 4 + 3 + i % 3], ensure_ascii=False) + "\n" for i in range(n))
+
+
+def _lines(text):
+    return sorted((json.loads(line) for line in text.splitlines()), key=lambda r: r["index"])
+
+
+def test_resume_from_checkpoint(db, tmp_path):
+    text = _queries(50)
+    full = io.StringIO()
+    assert run(io.StringIO(text), full, workers=2, chunk_size=8, domain="animal") == 7
+
+    # 模拟中途退出：分块 0、3 已写出并记入断点文件，再次运行只补齐其余分块
+    path = str(tmp_path / "run.checkpoint")
+    expected = _lines(full.getvalue())
+    partial = io.StringIO("".join(json.dumps(r, ensure_ascii=False) + "\n"
+                                  for r in expected if r["index"] // 8 in (0, 3)))
+    Checkpoint(path, 8).mark(0)
+    Checkpoint(path, 8).load().mark(3)
+    checkpoint = Checkpoint(path, 8).load()
+    partial.seek(0, io.SEEK_END)
+    assert run(io.StringIO(text), partial, workers=2, chunk_size=8, ordered=False,
+               checkpoint=checkpoint, domain="animal") == 5
+    assert _lines(partial.getvalue()) == expected
+    assert Checkpoint(path, 8).load().done == set(range(7))
+
+    with pytest.raises(SystemExit):
+        Checkpoint(path, 16).load()
+
+
+def test_worker_drops_inherited_connection(db):
+    inherited = database.get_connection()
+    batch_cli._init_worker(database.DB_NAME)
+    assert getattr(database._local, "conn", None) is None
+    inherited.execute("SELECT 1")  # 只是丢弃，没有关闭
+    assert database.get_connection() is not inherited
@@ -0,0 +1,24 @@
+# tests/test_batch_engine.py
+import batch_engine
+from batch_engine import RuleMatrix
+from conftest import random_queries, random_rules
+from rules_engine import infer, infer_book_batch
+
+
+def test_batch_matches_single_inference_on_thousands_of_rules(db, rng, monkeypatch):
+    """几千条规则的批量推理与逐条推理结论相同；内存上限很小时查询分成多批推理"""
+    rules = random_rules(rng, n_facts=400, n_rules=3000, n_inputs=60)
+    db.import_rules(rules, domain="large")
+    queries = random_queries(rng, 300, n_inputs=60)
+    proofs = [infer(features, "large") for features in queries]
+    expected = [(p.result(), set(p.conclusions())) for p in proofs]
+
+    def batch():
+        return [(result, {step.split(" → ")[1] for step in steps[:-1]})
+                for steps, result in infer_book_batch(queries, domain="large")]
+
+    assert batch() == expected
+    matrix = RuleMatrix.from_database("large")
+    monkeypatch.setattr(batch_engine, "MEMORY_BUDGET", 1024 * 1024)
+    assert 1 < matrix.queries_per_pass() < len(queries)
+    assert batch() == expected
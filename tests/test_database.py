@@ -0,0 +1,35 @@
+# tests/test_database.py
+import re
+
+
+def _matches(term, conditions, conclusion):
+    """page_rules 的搜索语义：不短于 3 个字按子串，更短的词按特征 / 结论中单词的前缀"""
+    text = conditions + "," + conclusion
+    if len(term) >= 3:
+        return term in text
+    return any(word.startswith(term) for word in re.findall(r"\w+", text))
+
+
+def _all_pages(db, query, limit):
+    """从第一页向后翻完所有页，返回按 ID 升序的规则"""
+    rows, more = db.page_rules("search", query, limit=limit)
+    pages = [rows]
+    while more:
+        rows, more = db.page_rules("search", query, after_id=pages[-1][-1][0], limit=limit)
+        pages.append(rows)
+    return [row for page in pages for row in page]
+
+
+def test_search_pages_match_reference(db, rng):
+    words = ["科幻", "科技", "外国作家", "20世纪", "文学", "现代", "悬疑", "外国", "历史"]
+    rules = [(",".join(rng.sample(words, rng.randint(1, 4))), f"《书{i}》") for i in range(600)]
+    db.import_rules(rules, domain="search")
+    db.add_rule("科幻,外国", "《不同领域》", "other")
+    stored = db.get_all_rules("search")
+    for query in ["", "科", "科幻", "外国作", "国作家", "世纪", "外国 科", "《书1", "书1 科幻", "科 《书2 历史", "无此词"]:
+        expected = [row for row in stored if all(_matches(t, row[1], row[2]) for t in query.split())]
+        assert _all_pages(db, query, 37) == expected, query
+
+    # 从末尾往前翻
+    rows, more = db.page_rules("search", "科", before_id=stored[-1][0] + 1, limit=37)
+    assert more and rows == [row for row in stored if _matches("科", row[1], row[2])][-37:]
@@ -0,0 +1,48 @@
+# tests/test_file_io.py
+import pytest
+
+from file_io import ResultJournal, read_journal
+
+
+def test_rotation_keeps_records_in_order(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    journal = ResultJournal(path, max_bytes=2000, backups=20, batch_size=8, flush_interval=0.01)
+    for i in range(200):
+        journal.record([f"f{i}"], f"c{i}")
+    journal.close()
+    assert (tmp_path / "results.jsonl.1").exists()
+    assert [r["conclusion"] for r in read_journal(path)] == [f"c{i}" for i in range(200)]
+
+    path = str(tmp_path / "small.jsonl")
+    journal = ResultJournal(path, max_bytes=2000, backups=2, batch_size=8, flush_interval=0.01)
+    for i in range(200):
+        journal.record([f"f{i}"], f"c{i}")
+    journal.close()
+    assert (tmp_path / "small.jsonl.2").exists() and not (tmp_path / "small.jsonl.3").exists()
+    assert [r["conclusion"] for r in read_journal(path)][-1] == "c199"
+
+
+def test_write_errors_do_not_stop_the_writer(tmp_path, capsys):
+    path = str(tmp_path / "results.jsonl")
+    journal = ResultJournal(path, flush_interval=0.01, legacy_path=str(tmp_path))  # 目录，无法追加写入
+    journal.record(["f1"], "c1")
+    journal.flush()
+    assert journal.failed == 1 and isinstance(journal.last_error, OSError)
+    assert "写入失败" in capsys.readouterr().err
+
+    journal.legacy_path = None
+    journal.record(["f2"], "c2")
+    journal.flush()
+    assert [r["conclusion"] for r in read_journal(path)] == ["c1", "c2"]
+    journal.close()
+
+
+def test_stopped_writer_fails_fast(tmp_path):
+    journal = ResultJournal(str(tmp_path / "results.jsonl"), flush_interval=0.01)
+    journal._queue.put(None)  # 让写入线程退出，但日志没有关闭
+    journal._thread.join()
+    with pytest.raises(RuntimeError):
+        journal.record(["f1"], "c1")
+    journal._queue.put({"features": [], "conclusion": None})
+    with pytest.raises(RuntimeError):
+        journal.flush()
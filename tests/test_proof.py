@@ -0,0 +1,39 @@
+# tests/test_proof.py
+from conftest import random_queries, random_rules, saturate
+from batch_engine import RuleMatrix
+from rete import ReteNetwork
+from rules_engine import infer, infer_batch
+import snapshot
+
+
+def test_final_conclusion_is_engine_independent(db, rng):
+    """各引擎、不同的事实添加顺序，推出的事实集合与最终结论都应相同"""
+    for n in range(20):
+        domain = f"random{n}"
+        rules = random_rules(rng)
+        db.import_rules(rules, domain=domain)
+        queries = random_queries(rng, 20)
+
+        network = ReteNetwork.from_database(domain)
+        batch = infer_batch(queries, domain=domain)
+        # 矩阵的数组直接引用快照的 mmap，快照随对象回收关闭
+        from_snapshot = RuleMatrix.from_snapshot(snapshot.open_snapshot(domain=domain)).prove(queries)
+        for features, proof, snap_proof in zip(queries, batch, from_snapshot):
+            facts = saturate(rules, features)
+            proofs = [infer(features, domain), proof, snap_proof,
+                      network.new_session(features).proof(),
+                      network.new_session(reversed(features)).proof()]
+            for p in proofs:
+                assert set(p.conclusions()) == facts - set(features)
+            assert {p.final for p in proofs} == {expected_final(network.rule_base, features, facts)}, features
+
+
+def expected_final(rule_base, features, facts):
+    """按定义直接计算：优先不作为任何条件的事实，再比较条件成立的规则中最小的 ID"""
+    best = None
+    for rule_id, cond_list, concl in rule_base.rules:
+        if concl in facts and concl not in features and all(c in facts for c in cond_list):
+            key = (concl in rule_base.by_feature, rule_id)
+            if best is None or key < best[0]:
+                best = (key, concl)
+    return best[1] if best else None
@@ -0,0 +1,22 @@
+# tests/test_rete.py
+from conftest import random_rules, saturate
+from rete import ReteNetwork
+from rule_base import CompiledRuleBase
+
+
+def test_assert_retract_matches_saturation(rng):
+    """随机添加 / 撤销事实后，会话中的事实与从头推理的结果相同，且每个推出的事实都有成立的依据"""
+    for n in range(40):
+        rules = random_rules(rng, cyclic=n % 2 == 1)
+        network = ReteNetwork(CompiledRuleBase([(i + 1, conds, concl) for i, (conds, concl) in enumerate(rules)]))
+        session = network.new_session()
+        for _ in range(60):
+            fact = f"f{rng.randrange(12)}"  # 偶尔也会添加 / 撤销可以推出的事实
+            if rng.random() < 0.6:
+                session.assert_fact(fact)
+            else:
+                session.retract_fact(fact)
+            assert set(session.facts) == saturate(rules, session.asserted)
+            for idx, concl in session.derived():
+                _, cond_list, rule_concl = network.rules[idx]
+                assert rule_concl == concl and all(c in session.facts for c in cond_list)
@@ -0,0 +1,64 @@
+# tests/test_rule_io.py
+import json
+from concurrent.futures import CancelledError
+
+import pytest
+
+import rule_io
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_non_object_records_are_invalid(db, tmp_path):
+    path = _write(tmp_path, "rules.json", json.dumps([
+        {"conditions": ["科幻", "太空"], "conclusion": "《三体》"},
+        [1, 2],
+        "科幻",
+        {"conditions": 5, "conclusion": "x"},
+        {"conditions": "悬疑", "conclusion": "《无人生还》"},
+    ], ensure_ascii=False))
+    summary = rule_io.import_file(path)
+    assert summary["inserted"] == 2 and summary["invalid"] == 3
+    assert [e.split("：")[0] for e in summary["errors"]] == ["第 2 行", "第 3 行", "第 4 行"]
+
+    path = _write(tmp_path, "rules.jsonl", '{"conditions": "历史", "conclusion": "《史记》"}\n[1]\n{bad\n')
+    summary = rule_io.import_file(path)
+    assert summary["inserted"] == 1 and summary["invalid"] == 2
+
+    before = db.stored_version()
+    with pytest.raises(ValueError):
+        rule_io.import_file(path, strict=True)
+    assert db.stored_version() == before
+
+
+def test_upsert_skips_unchanged_conclusions(db, tmp_path):
+    db.import_rules([("科幻,太空", "《三体》"), ("悬疑", "《无人生还》")], domain="upsert")
+    path = _write(tmp_path, "rules.csv", "conditions,conclusion\n\"太空, 科幻\",《三体》\n悬疑,《东方快车谋杀案》\n")
+    summary = rule_io.import_file(path, mode="upsert", domain="upsert")
+    assert (summary["updated"], summary["skipped"], summary["inserted"]) == (1, 1, 0)
+    assert [row[2] for row in db.get_all_rules("upsert")] == ["《三体》", "《东方快车谋杀案》"]
+
+    # 再导入一次：没有任何变化，不写入、版本号不变
+    version = db.stored_version("upsert")
+    summary = rule_io.import_file(path, mode="upsert", domain="upsert")
+    assert (summary["updated"], summary["skipped"]) == (0, 2)
+    assert db.stored_version("upsert") == version
+
+
+def test_cancelled_import_rolls_back(db):
+    rows = [(f"特征{i}", f"结论{i}") for i in range(50)]
+    calls = []
+
+    def cancelled():
+        calls.append(1)
+        return len(calls) > 2
+
+    with pytest.raises(CancelledError):
+        db.import_rules(rows, batch_size=10, domain="cancel", cancelled=cancelled)
+    assert len(calls) == 3
+    assert db.get_all_rules("cancel") == []
+    assert db.import_rules(rows, batch_size=10, domain="cancel", cancelled=lambda: False)["inserted"] == 50
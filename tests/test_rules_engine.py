@@ -0,0 +1,21 @@
+# tests/test_rules_engine.py
+from conftest import random_queries, random_rules, saturate
+from analyzer import evaluation_plan
+from rule_base import CompiledRuleBase
+from rules_engine import _saturate
+
+
+def test_stratified_saturation_matches_baseline(rng):
+    """分层、去掉无效规则后的求值与原来的 while 循环推出相同的事实"""
+    for n in range(50):
+        rules = random_rules(rng, cyclic=n % 2 == 1)
+        # 加入完全相同、被包含以及结论就是自己条件的规则
+        rules += [rng.choice(rules) for _ in range(10)]
+        rules += [(conds + ",f0", concl) for conds, concl in rng.sample(rules, 10)]
+        rules += [(f"{concl},f1", concl) for _, concl in rng.sample(rules, 5)]
+        rule_base = CompiledRuleBase([(i + 1, conds, concl) for i, (conds, concl) in enumerate(rules)])
+        plan = evaluation_plan(rule_base)
+        for features in random_queries(rng, 30):
+            fired = _saturate(plan, features)
+            assert set(features) | {rule[2] for rule in fired} == saturate(rules, features)
+            assert len(fired) == len({rule[2] for rule in fired})
@@ -0,0 +1,81 @@
+# tests/test_server.py
+import asyncio
+import json
+
+from server import start_server
+
+
+async def _request(port, method, path, body=None, length=None):
+    """length 用来伪造 Content-Length 头，默认取请求体的实际长度"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+    length = len(data) if length is None else length
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {length}\r\nConnection: close\r\n\r\n"
+                 .encode("latin-1") + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def _run(requests):
+    async def main():
+        server, service = await start_server(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return [await _request(port, *r) for r in requests]
+        finally:
+            server.close()
+            service.readers.shutdown()
+            service.executor.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_requests_are_validated(db):
+    results = _run([
+        ("POST", "/infer", [1]),
+        ("POST", "/prove", {"features": ["有毛发"], "goals": [["哺乳类"]], "domain": "animal"}),
+        ("POST", "/prove", {"features": ["有毛发"], "goals": ["哺乳类"], "domain": "animal"}),
+        ("POST", "/infer", {"features": ["有羽毛", "善飞"], "domain": "animal", "explain": False}),
+        ("POST", "/rules", "科幻"),
+        ("POST", "/infer", {"features": [], "domain": "nope"}),
+        ("GET", "/domains"),
+        ("GET", "/metrics"),
+    ])
+    statuses = [status for status, _ in results]
+    assert statuses == [400, 400, 200, 200, 400, 404, 200, 200]
+    assert results[2][1]["哺乳类"]["holds"]
+    assert results[3][1]["conclusion"] == "信天翁"
+    assert {d["name"] for d in results[6][1]} == {"animal", "book"}
+    metrics = results[7][1]
+    assert metrics["requests"] == 7 and metrics["routes"]["prove"]["count"] == 1
+    assert metrics["rule_base_version"] is not None and "result_cache" in metrics
+
+
+def test_bad_content_length_is_rejected(db):
+    results = _run([
+        ("POST", "/infer", {"features": []}, "abc"),
+        ("POST", "/infer", {"features": []}, -1),
+        ("GET", "/domains"),
+    ])
+    assert [status for status, _ in results] == [400, 400, 200]
+
+
+def test_rule_updates_respect_domain(db):
+    """PUT/DELETE 只作用于 ?domain= 指定领域的规则，没有匹配的规则时返回 404"""
+    rule_id, conditions, conclusion = db.get_all_rules("book")[0]
+    missing = max(r[0] for r in db.get_all_rules("book") + db.get_all_rules("animal")) + 1
+    edited = {"conditions": "有毛发", "conclusion": "哺乳类"}
+    results = _run([
+        ("PUT", f"/rules/{rule_id}?domain=animal", edited),
+        ("DELETE", f"/rules/{rule_id}?domain=animal"),
+        ("PUT", f"/rules/{missing}", edited),
+        ("DELETE", f"/rules/{missing}"),
+        ("PUT", f"/rules/{rule_id}?domain=book", {"conditions": conditions, "conclusion": "新结论"}),
+    ])
+    assert [status for status, _ in results] == [404, 404, 404, 404, 200]
+    assert db.get_rule(rule_id) == (rule_id, conditions, "新结论")
+    assert _run([("DELETE", f"/rules/{rule_id}")])[0][0] == 200
+    assert db.get_rule(rule_id) is None
@@ -0,0 +1,112 @@
+# worker.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CancelToken:
+    """任务的取消标记与进度信息，由后台任务自行检查"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.progress = None
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def report(self, progress):
+        """后台任务汇报进度（文字或 0~1 的比例），由主线程定时读取"""
+        self.progress = progress
+
+
+class TaskRunner:
+    """在后台线程执行耗时任务，并通过 root.after 把结果送回 Tk 主线程
+
+    同一 key 的任务在运行时再次提交，只保留最后一次请求，
+    当前任务结束后再执行它（连续点击会被合并成一次）。
+    取消只是设置 token 的取消标记并丢弃结果：线程无法被强行终止，
+    耗时的任务（导入、生成图谱）需要自行检查 token.cancelled 才能提前结束。
+    """
+
+    def __init__(self, root, max_workers=2, poll_interval=50, on_busy=None, on_progress=None):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.on_busy = on_busy          # on_busy(正在运行的任务数)
+        self.on_progress = on_progress  # on_progress(key, progress)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="gui-worker")
+        self._running = {}   # key -> (token, 回调)
+        self._pending = {}   # key -> 被合并的最新请求
+        self._done = queue.Queue()
+        self._polling = False
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None):
+        """提交任务 fn(token, *args)；on_done / on_error 在主线程中调用"""
+        request = (fn, args, on_done, on_error)
+        if key in self._running:
+            self._pending[key] = request
+            return
+        self._start(key, request)
+
+    def cancel(self, key=None):
+        """取消任务（key 为空时取消全部）：丢弃其结果和排队的请求，并通知任务尽早结束"""
+        keys = [key] if key is not None else list(self._running)
+        for k in keys:
+            self._pending.pop(k, None)
+            if k in self._running:
+                self._running[k][0].cancel()
+
+    def busy(self):
+        return len(self._running)
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, key, request):
+        fn, args, on_done, on_error = request
+        token = CancelToken()
+        self._running[key] = (token, on_done, on_error)
+        future = self._executor.submit(fn, token, *args)
+        future.add_done_callback(lambda f, k=key: self._done.put((k, f)))
+        self._notify_busy()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        # 只在主线程中读取完成队列和调用回调（Tk 不是线程安全的）
+        while True:
+            try:
+                key, future = self._done.get_nowait()
+            except queue.Empty:
+                break
+            token, on_done, on_error = self._running.pop(key)
+            superseded = key in self._pending
+            if not token.cancelled and not superseded:
+                error = future.exception()
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                elif on_done:
+                    on_done(future.result())
+            if superseded:
+                self._start(key, self._pending.pop(key))
+            self._notify_busy()
+
+        if self.on_progress:
+            for key, (token, _, _) in self._running.items():
+                if token.progress is not None:
+                    self.on_progress(key, token.progress)
+
+        if self._running:
+            self.root.after(self.poll_interval, self._poll)
+        else:
+            self._polling = False
+
+    def _notify_busy(self):
+        if self.on_busy:
+            self.on_busy(len(self._running))